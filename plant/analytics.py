@@ -0,0 +1,170 @@
+import time
+import threading
+from collections import Counter
+
+import database
+import sqlite_store
+
+# Prediction counts maintained incrementally instead of by rescanning the
+# store: per disease, per user, per region+disease and per disease in hourly
+# and daily buckets. With the JSON log only the lines appended since the
+# last query are read; with SQLite the counts live in the rollups table,
+# kept up to date by triggers.
+HOUR = 3600
+DAY = 86400
+
+DIMENSIONS = ("disease", "user", "region", "hour", "day")
+
+
+def _keys(rec):
+    """Rollup keys of one prediction record, as (dimension, key) pairs."""
+    disease = rec.get("disease")
+    keys = [("disease", disease), ("user", str(rec.get("user_id"))),
+            ("region", f"{rec.get('region') or ''}|{disease}")]
+    ts = rec.get("timestamp")
+    if ts:
+        keys.append(("hour", f"{disease}|{int(ts // HOUR)}"))
+        keys.append(("day", f"{disease}|{int(ts // DAY)}"))
+    return keys
+
+
+class LogRollups:
+    """
+    Rollups over an AppendLog, caught up by tailing the log on each read.
+    Only the counts are kept: a tombstone carries the offset of the line
+    it deletes, which is read back to know what to subtract. When the log
+    file is replaced (compaction, rewrite) the counts are rebuilt from the
+    live records in one sequential read.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self._lock = threading.Lock()
+        self.counts = {dim: Counter() for dim in DIMENSIONS}
+        self._offset = 0
+        self._inode = None
+
+    def _add(self, rec, sign=1):
+        for dim, key in _keys(rec):
+            self.counts[dim][key] += sign
+
+    def _rebuild(self):
+        self.counts = {dim: Counter() for dim in DIMENSIONS}
+        self._offset, self._inode = self.log.fold_live(lambda rid, rec: self._add(rec or {}))
+
+    def _deleted(self, tombstone, inode):
+        """The record a tombstone deletes, or None if it cannot be found."""
+        if "at" not in tombstone:
+            return None
+        entry = self.log.read_at(tombstone["at"], inode)
+        if not isinstance(entry, dict) or entry.get("id") != tombstone["id"] or "rec" not in entry:
+            return None
+        return entry["rec"] or {}
+
+    def _catch_up(self):
+        entries, offset, inode = self.log.read_since(self._offset, self._inode)
+        if entries is None:
+            self._rebuild()
+            return
+        for entry in entries:
+            if entry.get("del"):
+                rec = self._deleted(entry, inode)
+                if rec is None:
+                    # no way to tell what was deleted: start over
+                    self._rebuild()
+                    return
+                self._add(rec, -1)
+            else:
+                self._add(entry.get("rec") or {})
+        self._offset = offset
+        self._inode = inode
+
+    def count(self, dim, key):
+        with self._lock:
+            self._catch_up()
+            return self.counts[dim][key]
+
+    def count_many(self, dim, keys):
+        """[count of each key], caught up once for all of them."""
+        with self._lock:
+            self._catch_up()
+            counts = self.counts[dim]
+            return [counts[key] for key in keys]
+
+    def counts_for(self, dim):
+        with self._lock:
+            self._catch_up()
+            return {k: n for k, n in self.counts[dim].items() if n > 0}
+
+
+class SQLiteRollups:
+
+    def __init__(self, store):
+        self.store = store
+
+    def count(self, dim, key):
+        return self.store.rollup_count(dim, key)
+
+    def count_many(self, dim, keys):
+        return self.store.rollup_count_many(dim, keys)
+
+    def counts_for(self, dim):
+        return self.store.rollup_counts(dim)
+
+
+_rollups = None
+_rollups_lock = threading.Lock()
+
+
+def get_rollups():
+    global _rollups
+    with _rollups_lock:
+        if _rollups is None:
+            if sqlite_store.STORAGE_BACKEND == "sqlite":
+                _rollups = SQLiteRollups(sqlite_store.get_store())
+            else:
+                _rollups = LogRollups(database._predictions)
+        return _rollups
+
+
+def disease_counts():
+    """{disease: number of predictions}."""
+    return get_rollups().counts_for("disease")
+
+
+def user_counts():
+    """{user_id: number of predictions}."""
+    return {int(k): n for k, n in get_rollups().counts_for("user").items() if k.lstrip("-").isdigit()}
+
+
+def region_counts():
+    """{(region, disease): number of predictions}; region is "" when unknown."""
+    return {tuple(k.split("|", 1)): n for k, n in get_rollups().counts_for("region").items()}
+
+
+def _bucketed(diseases, dim, size, buckets, now):
+    """{disease: [(bucket start epoch, count), ...]}, from one rollup lookup."""
+    last = int((now or time.time()) // size)
+    starts = range(last - buckets + 1, last + 1)
+    counts = iter(get_rollups().count_many(dim, [f"{d}|{b}" for d in diseases for b in starts]))
+    return {d: [(b * size, next(counts)) for b in starts] for d in diseases}
+
+
+def hourly_counts(disease, hours=24, now=None):
+    """[(hour start epoch, count), ...] for the last `hours` hours, oldest first."""
+    return _bucketed([disease], "hour", HOUR, hours, now)[disease]
+
+
+def daily_counts(disease, days=7, now=None):
+    """[(day start epoch, count), ...] for the last `days` UTC days, oldest first."""
+    return daily_counts_many([disease], days, now)[disease]
+
+
+def daily_counts_many(diseases, days=7, now=None):
+    """daily_counts() of several diseases at once: {disease: [(day start epoch, count), ...]}."""
+    return _bucketed(list(diseases), "day", DAY, days, now)
+
+
+def cases_last_days(disease, days=7, now=None):
+    """Predictions of `disease` in the last `days` days (including today)."""
+    return sum(n for _, n in daily_counts(disease, days, now))
@@ -1,6 +1,5 @@
 import streamlit as st
-import os
-import json
+from datetime import datetime, timedelta
 
 from user import (
     register_user,
@@ -8,30 +7,35 @@ from user import (
     is_admin,
     get_user_id,
     get_all_users,
-    delete_user,
+    delete_users,
     create_default_admin,
     any_admin_exists
 )
 from database import (
     save_prediction, 
     get_user_predictions, 
-    get_all_predictions, 
-    delete_predictions_by_user, 
-    delete_prediction_at_index,
+    clear_predictions,
     save_chat_message, 
-    get_user_chats, 
-    get_all_chats, 
-    delete_chats_by_user, 
-    delete_chat_at_index
+    query_predictions,
+    delete_prediction,
+    query_chats,
+    latest_user_chats,
+    delete_chat,
+    compact as compact_storage
 )
 
-
-from PIL import Image
-import tensorflow as tf
-import numpy as np
-import cv2
-import random
-from googletrans import Translator
+# tensorflow, cv2 and numpy are not imported here: the model loads in the
+# background (model_loader) and the Disease Recognition page imports the
+# inference stack itself, so the other pages render without them.
+from translation import lang_dict, tr, prefetch
+import analytics
+import metrics
+import model_loader
+import inference_client
+from disease_kb import get_kb, localized
+
+# /metrics endpoint when AGROBOT_METRICS_PORT is set; started once per process
+metrics.start_server()
 # after your imports in app.py
 from user import create_default_admin, any_admin_exists
 
@@ -45,70 +49,50 @@ if not any_admin_exists():
 
 
 
-model_path = "CNN_plant_disease_model.keras"
+# no-op after the first run in this process; with AGROBOT_INFERENCE_URL
+# the model lives in inference_service.py instead
+if not inference_client.SERVICE_URL:
+    model_loader.start()
+
 
 
-if os.path.exists(model_path):
-    try:
-        model = tf.keras.models.load_model(model_path)
-        print(f"Model loaded successfully from {model_path}")
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        exit()
-else:
-    print(f"Model file not found: {model_path}")
-    exit()
-
-
-lang_dict = {
-    "English": "en",
-    "Hindi": "hi",
-    "Bengali": "bn",
-    "Marathi": "mr",
-    "Tamil": "ta",
-    "Telugu": "te",
-    "Gujarati": "gu",
-    "Kannada": "kn",
-    "Malayalam": "ml",
-    "Punjabi": "pa",
-    "Odia": "or",
-    "Assamese": "as",
-    "Urdu": "ur"
-}
-
-
-
-translator = Translator()
-
-PLANT_DISEASES_FILE = "plant_diseases.json" 
-
-def get_plantdoctor_response(user_input, lang_code="en"):
-    # Load the plant diseases dataset
-    with open(PLANT_DISEASES_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    responses = []
-    
-    for disease in data["plant_diseases"]:
-        for keyword in disease["keywords"]:
-            if keyword.lower() in user_input.lower():
-                response_text = (
-                    f"Disease: {disease['class']}\n"
-                    f"Symptoms: {', '.join(disease['symptoms'])}\n"
-                    f"Solutions: {', '.join(disease['solutions'])}"
-                )
-                if lang_code != "en":
-                    response_text = translator.translate(response_text, dest=lang_code).text
-                responses.append(response_text)
-    
-    if responses:
-        return random.choice(responses)
-    else:
-        default_msg = "Sorry, I couldn't identify the plant disease. Please try again or upload an image."
-        if lang_code != "en":
-            default_msg = translator.translate(default_msg, dest=lang_code).text
-        return default_msg
 
+ADMIN_PAGE_SIZE = 25
+CHAT_PAGE_SIZE = 20
+
+def pager(key, total, page_size=ADMIN_PAGE_SIZE):
+    """Page picker for the admin tables, returns the offset of the chosen page."""
+    pages = max((total + page_size - 1) // page_size, 1)
+    if st.session_state.get(key, 1) > pages:  # rows were deleted since
+        st.session_state[key] = pages
+    page = st.number_input(f"Page (1-{pages}, {total} total)", min_value=1, max_value=pages, key=key)
+    return (int(page) - 1) * page_size
+
+def paged_query(key, query, page_size=ADMIN_PAGE_SIZE):
+    """
+    One page of an admin table with its page picker, from a single
+    query(offset, limit) -> (rows, total) call: the page picked on the
+    previous run gives the offset, the total that comes back sizes the
+    picker. Returns (rows, total, offset).
+    """
+    offset = (int(st.session_state.get(key, 1)) - 1) * page_size
+    rows, total = query(offset, page_size)
+    if total and offset >= total:
+        # past the end (rows were deleted since): load the last page
+        offset = (total - 1) // page_size * page_size
+        rows, total = query(offset, page_size)
+    if total:
+        pager(key, total, page_size)
+    return rows, total, offset
+
+def date_range_to_epoch(dates):
+    """(start_date, end_date) from st.date_input -> (since, until) epoch seconds, end day inclusive."""
+    if not isinstance(dates, (list, tuple)) or len(dates) != 2:
+        return None, None
+    start, end = dates
+    since = datetime.combine(start, datetime.min.time()).timestamp()
+    until = datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp()
+    return since, until
 
 
 if "logged_in" not in st.session_state:
@@ -118,6 +102,8 @@ if "logged_in" not in st.session_state:
 st.sidebar.title("🌱 Plant Disease Detection")
 selected_lang = st.sidebar.selectbox("Choose Language", list(lang_dict.keys()))
 lang_code = lang_dict[selected_lang]
+# fetch every static label for this language in one batch (no-op once cached)
+prefetch(lang_code)
 
 if st.session_state["logged_in"]:
     st.sidebar.success(f"Hello, {st.session_state['username']} 👋")
@@ -160,44 +146,65 @@ elif menu == "Login":
             st.error("❌ Invalid username or password.")
 
 elif menu == "Disease Recognition":
+    import numpy as np
+    from chatbot import get_response
+
     if not st.session_state["logged_in"]:
         st.warning("⚠️ You need to log in first.")
     else:
-        st.header(translator.translate("Disease Recognition: Detect and Ask", dest=lang_code).text)
+        st.header(tr("Disease Recognition: Detect and Ask", lang_code))
 
         # ====== Image Upload & Prediction ======
-        uploaded_file = st.file_uploader(translator.translate("Upload an image to detect plant diseases:", dest=lang_code).text,
+        uploaded_file = st.file_uploader(tr("Upload an image to detect plant diseases:", lang_code),
                                          type=["jpg", "png", "jpeg"])
         if uploaded_file:
-            st.image(uploaded_file, caption=translator.translate("Uploaded Image", dest=lang_code).text,
+            st.image(uploaded_file, caption=tr("Uploaded Image", lang_code),
                      use_container_width=True)
-            save_path = os.path.join(os.getcwd(), uploaded_file.name)
-            with open(save_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            # Class names and advisory messages
-                class_name = [ 'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy', 'Blueberry___healthy', 'Cherry_(including_sour)___Powdery_mildew', 'Cherry_(including_sour)___healthy', 'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot', 'Corn_(maize)___Common_rust_', 'Corn_(maize)___Northern_Leaf_Blight', 'Corn_(maize)___healthy', 'Grape___Black_rot', 'Grape___Esca_(Black_Measles)', 'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)', 'Grape___healthy', 'Orange___Haunglongbing_(Citrus_greening)', 'Peach___Bacterial_spot', 'Peach___healthy', 'Pepper,_bell___Bacterial_spot', 'Pepper,_bell___healthy', 'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy', 'Raspberry___healthy', 'Soybean___healthy', 'Squash___Powdery_mildew', 'Strawberry___Leaf_scorch', 'Strawberry___healthy', 'Tomato___Bacterial_spot', 'Tomato___Early_blight', 'Tomato___Late_blight', 'Tomato___Leaf_Mold', 'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites Two-spotted_spider_mite', 'Tomato___Target_Spot', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus', 'Tomato___healthy' ] # Add your class names here 
-                advisory_messages = { 'Apple___Apple_scab': "Apple scab can be controlled by applying fungicides. Prune affected areas and avoid overhead watering.", 'Apple___Black_rot': "Black rot can be treated by removing infected fruits and branches. Fungicides can also help.", 'Apple___Cedar_apple_rust': "Cedar apple rust can be managed by removing affected leaves and applying fungicides.", # More diseases here... 
-                                     'Tomato___healthy': "Your tomato plant is healthy!", 'Apple___Apple_scab': "Apply fungicide sprays (e.g., Captan, Mancozeb) and remove infected leaves.", 'Apple___Black_rot': "Prune infected branches, remove mummified fruit, and apply copper-based fungicides.", 'Apple___Cedar_apple_rust': "Use resistant apple varieties and apply fungicide sprays at bud break.", 'Apple___healthy': "No treatment needed. Maintain proper orchard hygiene.", 'Blueberry___healthy': "Your plant is healthy! Maintain soil moisture and monitor for pests.", 'Cherry_(including_sour)___Powdery_mildew': "Apply sulfur-based or neem oil sprays and prune overcrowded branches.", 'Cherry_(including_sour)___healthy': "No treatment required. Ensure proper watering and pruning.", 'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot': "Use resistant varieties, rotate crops, and apply fungicides like azoxystrobin.", 'Corn_(maize)___Common_rust_': "Plant resistant hybrids and apply fungicides if necessary.", 'Corn_(maize)___Northern_Leaf_Blight': "Remove infected debris, use fungicides like propiconazole, and practice crop rotation.", 'Corn_(maize)___healthy': "Your corn is healthy! Maintain proper irrigation and nutrient balance.", 'Grape___Black_rot': "Remove infected leaves and fruits, ensure good air circulation, and apply fungicides like myclobutanil.", 'Grape___Esca_(Black_Measles)': "Prune infected vines, avoid overwatering, and apply fungicides like flutriafol.", 'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)': "Use copper fungicides and ensure proper vineyard spacing for airflow.", 'Grape___healthy': "No issues detected. Keep monitoring for signs of disease.", 'Orange___Haunglongbing_(Citrus_greening)': "Control psyllid insects with insecticides and remove infected trees if necessary.", 'Peach___Bacterial_spot': "Apply copper sprays before bud break and avoid overhead irrigation.", 'Peach___healthy': "No issues detected. Keep monitoring for pests and diseases.", 'Pepper,_bell___Bacterial_spot': "Apply copper fungicides and practice crop rotation.", 'Pepper,_bell___healthy': "No treatment needed. Maintain optimal soil moisture and nutrients.", 'Potato___Early_blight': "Use fungicides like chlorothalonil and remove infected leaves.", 'Potato___Late_blight': "Apply fungicides like metalaxyl and avoid excessive moisture.", 'Potato___healthy': "Your potato plants are healthy! Keep monitoring for any signs of disease.", 'Raspberry___healthy': "No issues detected. Ensure proper pruning for airflow.", 'Soybean___healthy': "No disease detected. Maintain proper soil health and irrigation.", 'Squash___Powdery_mildew': "Use sulfur-based fungicides and avoid overhead watering.", 'Strawberry___Leaf_scorch': "Remove infected leaves and apply fungicides like Captan.", 'Strawberry___healthy': "Your strawberry plants are healthy! Keep monitoring for pests.", 'Tomato___Bacterial_spot': "Apply copper sprays and avoid overhead watering.", 'Tomato___Early_blight': "Rotate crops, remove infected leaves, and use fungicides like chlorothalonil.", 'Tomato___Late_blight': "Apply copper-based fungicides and remove affected leaves.", 'Tomato___Leaf_Mold': "Improve air circulation, remove affected leaves, and apply fungicides.", 'Tomato___Septoria_leaf_spot': "Use fungicides like chlorothalonil and practice crop rotation.", 'Tomato___Spider_mites Two-spotted_spider_mite': "Use neem oil or insecticidal soap to control mites.", 'Tomato___Target_Spot': "Apply fungicides and remove infected leaves.", 'Tomato___Tomato_Yellow_Leaf_Curl_Virus': "Use virus-resistant seeds and control whiteflies.", 'Tomato___Tomato_mosaic_virus': "Remove infected plants and disinfect gardening tools.", 'Tomato___healthy': "Your tomato plant is healthy! Maintain good watering and fertilization practices." } # Add your advisory messages here 
-                product_links = { 'Apple___Apple_scab': [ {"name": "Captan Fungicide", "url": "https://example.com/captan-fungicide"}, {"name": "Mancozeb Fungicide", "url": "https://example.com/mancozeb-fungicide"} ], 'Apple___Black_rot': [ {"name": "Copper Fungicide", "url": "https://example.com/copper-fungicide"}, {"name": "Pruning Shears", "url": "https://example.com/pruning-shears"} ], 'Apple___Cedar_apple_rust': [ {"name": "Captan Fungicide", "url": "https://www.westonnurseries.com/cedar-apple-rust/?utm_source=chatgpt.com"}, {"name": "Mancozeb Fungicide", "url": "https://kb.jniplants.com/preventing-cedar-apple-rust?utm_source=chatgpt.com"} ], 'Potato___Early_blight': [ {"name": "Copper Fungicide", "url": "https://krushidukan.bharatagri.com/en/products/potato-surkasha-kit-blight-1?variant=43452570599667&currency=INR&utm_source=google&utm_medium=organic&utm_campaign=Primary%20Feed%20English&utm_content=%E0%A4%86%E0%A4%B2%E0%A5%82%20%E0%A4%B8%E0%A5%81%E0%A4%B0%E0%A4%95%E0%A5%8D%E0%A4%B7%E0%A4%BE%20%E0%A4%95%E0%A4%BF%E0%A4%9F%20-%20%E0%A4%9D%E0%A5%81%E0%A4%B2%E0%A4%B8%E0%A4%BE%20%E0%A4%B0%E0%A5%8B%E0%A4%97%20%E0%A4%A8%E0%A4%BF%E0%A4%AF%E0%A4%82%E0%A4%A4%E0%A5%8D%E0%A4%B0%E0%A4%A3%20(25-90%20%E0%A4%A6%E0%A4%BF%E0%A4%A8)&srsltid=AfmBOopLVmRNEevNO_jBnzRE9KkhXElR9T576tqebQyYMn5HYl5_-3BxvhY"}, {"name": "Pruning Shears", "url": "https://krushidukan.bharatagri.com/en/products/control-kit-in-turmeric-ginger?variant=45881589137651&country=IN&currency=INR&utm_medium=product_sync&utm_source=google&utm_content=sag_organic&utm_campaign=sag_organic&srsltid=AfmBOopUbV3Fm1-fEEipAsFVihQdSEioQDBpv1Hq7nrV9cdCeX9NZf7Ae1Y"} ],
-                            
-                                }
-
-            # Prediction function
-            def model_predict(image_path):
-                img = cv2.imread(image_path)
-                img = cv2.resize(img, (224, 224))
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                img = np.array(img).astype("float32") / 255.0
-                img = img.reshape(1, 224, 224, 3)
-                prediction = np.argmax(model.predict(img), axis=-1)[0]
-                return prediction
+
+            if inference_client.SERVICE_URL:
+                # decode, batching and the forward pass run in the shared service
+                client = inference_client.get_client()
+
+                def model_predict(upload):
+                    with metrics.timer("recognition_stage", stage="total"):
+                        try:
+                            result = client.predict(upload.getbuffer(), top_k=1)
+                        except inference_client.ServiceError as e:
+                            st.error(f"Error contacting inference service: {e}")
+                            st.stop()
+                    return result["index"]
+            else:
+                try:
+                    with st.spinner(tr("Loading model...", lang_code)):
+                        inference = model_loader.get_inference()
+                except Exception as e:
+                    st.error(f"Error loading model: {e}")
+                    st.stop()
+                import preprocess
+
+                # Prediction function
+                def model_predict(upload):
+                    def run_model():
+                        with metrics.timer("recognition_stage", stage="decode"):
+                            img = preprocess.read_upload(upload)
+                        # resize, channel swap and scaling happen in the model graph
+                        with metrics.timer("recognition_stage", stage="predict"):
+                            return inference.predict_one_raw(img)
+
+                    # same image bytes -> cached result, no forward pass
+                    with metrics.timer("recognition_stage", stage="total"):
+                        probs = inference.cache.get_or_compute(upload.getbuffer(), run_model)
+                    prediction = np.argmax(probs)
+                    return prediction
+
+            # class index -> label, advisory and products, pre-rendered per language
+            kb = get_kb()
 
             # Predict button
-            if st.button(translator.translate("Predict", dest=lang_code).text):
-                result_index = model_predict(save_path)
-                if result_index < len(class_name):
-                    predicted_disease = class_name[result_index]
+            if st.button(tr("Predict", lang_code)):
+                entry = kb.entry(int(model_predict(uploaded_file)))
+                if entry is not None:
+                    predicted_disease = entry["class"]
 
                     # Save history
                     user_id = get_user_id(st.session_state["username"])
@@ -205,132 +212,46 @@ elif menu == "Disease Recognition":
                         save_prediction(user_id, predicted_disease)
 
                     # Display prediction
-                    translated_disease = translator.translate(predicted_disease, dest=lang_code).text
-                    st.success(translator.translate("Model predicts:", dest=lang_code).text + " " + translated_disease)
+                    st.success(tr("Model predicts:", lang_code) + " " + localized(entry["label"], lang_code))
 
                     # Advisory message
-                    if predicted_disease in advisory_messages:
-                        translated_advice = translator.translate(advisory_messages[predicted_disease], dest=lang_code).text
-                        st.subheader(translator.translate("Advisory:", dest=lang_code).text)
-                        st.write(translated_advice)
+                    if entry["advice"]:
+                        st.subheader(tr("Advisory:", lang_code))
+                        st.write(localized(entry["advice"], lang_code))
 
                     # Product links
-                    if predicted_disease in product_links:
-                        st.subheader(translator.translate("Recommended Products:", dest=lang_code).text)
-                        for product in product_links[predicted_disease]:
+                    if entry["products"]:
+                        st.subheader(tr("Recommended Products:", lang_code))
+                        for product in entry["products"]:
                             st.markdown(f"[{product['name']}]({product['url']})")
 
                 else:
                     st.error("Prediction index out of range. Check class list.")
 
        # ====== PlantDoctor Chat Section ======
-        st.subheader(translator.translate("💬 Ask PlantDoctor", dest=lang_code).text)
-
-        # Q&A Knowledge Base
-        qa_pairs = {
-            "greeting": "Hello! 👋 I’m your PlantDoctor 🌿. How can I help your plants today?",
-    "thanks": "You're welcome! 😊 Keep your plants happy and healthy 🌻",
-    "who are you": "I'm PlantDoctor, your AI gardening buddy! I help diagnose plant problems and share care tips.",
-
-    # Common issues
-    "yellow leaves": "🌿 Yellow leaves usually mean overwatering or lack of nitrogen. Let the soil dry before watering and add a balanced fertilizer.",
-    "brown spots": "🍂 Brown spots often indicate fungal infection. Remove infected leaves and apply a mild fungicide like neem oil.",
-    "wilting": "😞 Wilting might be from underwatering, heat stress, or root rot. Check soil moisture and avoid waterlogging.",
-    "white powder": "🌫️ White powder on leaves is powdery mildew. Increase air circulation and spray neem oil or baking soda solution.",
-    "leaf curling": "🌀 Leaf curling can occur due to pest attacks, over-fertilizing, or temperature stress.",
-    "dropping leaves": "🍃 Leaf drop can be caused by sudden temperature changes or lack of light. Keep the plant in a stable environment.",
-    "holes in leaves": "🐛 Holes usually mean pest activity like caterpillars or beetles. Inspect and remove pests manually or use neem spray.",
-    "sticky leaves": "🌸 Sticky leaves could mean aphids or mealybugs. Wipe them with soapy water and spray neem oil.",
-    "black spots": "⚫ Black spots on leaves may be a fungal disease. Remove affected parts and keep leaves dry.",
-    "brown tips": "🌾 Brown leaf tips often mean low humidity or too much fertilizer. Mist your plants or flush the soil with water.",
-
-    # Growth & care
-    "fertilizer": "🧪 Use nitrogen-rich fertilizer for leafy plants and phosphorus-rich for flowering plants.",
-    "watering": "💧 Water when the top 2 inches of soil are dry. Avoid letting the plant sit in water.",
-    "sunlight": "☀️ Most indoor plants prefer indirect sunlight. Too much direct sun can scorch the leaves.",
-    "repotting": "🪴 Repot every 6–12 months or when roots start peeking through the bottom holes.",
-    "pruning": "✂️ Regular pruning helps plants grow fuller and removes dead parts.",
-    "temperature": "🌤️ Most houseplants thrive between 18–28°C. Avoid cold drafts or sudden changes.",
-    "humidity": "💦 Many tropical plants love humidity. Mist leaves or use a humidifier if air is dry.",
-    "soil": "🌱 Use well-draining soil. For succulents, use cactus mix; for flowering plants, use loamy soil.",
-    "lighting": "💡 Too little light causes leggy growth. Move your plant near a window with indirect sunlight.",
-
-    # Pests
-    "aphids": "🪲 Aphids are tiny green pests that suck sap. Use neem oil or insecticidal soap weekly until gone.",
-    "mealybugs": "⚪ Mealybugs look like white cottony spots. Dab them with alcohol and spray neem oil.",
-    "spider mites": "🕷️ Spider mites cause yellow specks and fine webbing. Spray water mist daily and use miticide if needed.",
-    "fungus gnats": "🪰 Fungus gnats thrive in moist soil. Let soil dry and use sticky traps.",
-    "snails": "🐌 Snails and slugs eat leaves. Handpick them and keep soil dry.",
-
-    # Seasonal care
-    "winter care": "❄️ In winter, water less and move plants near light. Avoid cold drafts.",
-    "summer care": "☀️ In summer, increase watering and mist leaves more often.",
-    "rainy season": "🌧️ During rains, avoid overwatering and check for fungal growth.",
-    
-    # Fun / small talk
-    "joke": "😂 Why did the plant go to therapy? It had too many roots in its past!",
-    "motivation": "💪 Keep going! Every leaf you save makes your plant proud of you 🌿",
-    "love plants": "💚 Plants are pure magic! They bring peace, beauty, and oxygen.",
-    "bye": "👋 Goodbye! Keep your plants smiling and come back anytime 🌻"
-        }
-
-    # Fuzzy matching response function
-    import difflib, random
-
-    def get_response(user_input, lang_code="en"):
-        user_input_lower = user_input.lower()
-
-        # 1️⃣ First, check the plant_diseases JSON keywords
-        plant_response = get_plantdoctor_response(user_input, lang_code=lang_code)
-        if "Sorry, I couldn't identify the plant disease" not in plant_response:
-            return plant_response
-
-        # Basic conversation triggers
-        if any(word in user_input_lower for word in ["hi", "hello", "hey"]):
-            return qa_pairs["greeting"]
-        if "thank" in user_input_lower:
-            return qa_pairs["thanks"]
-        if "who are you" in user_input_lower or "your name" in user_input_lower:
-            return qa_pairs["who are you"]
-        if "bye" in user_input_lower or "goodbye" in user_input_lower:
-            return qa_pairs["bye"]
-        if "joke" in user_input_lower:
-            return qa_pairs["joke"]
-        if "motivate" in user_input_lower or "motivation" in user_input_lower:
-            return qa_pairs["motivation"]
-        if "love" in user_input_lower and "plant" in user_input_lower:
-            return qa_pairs["love plants"]
-
-        # Best match from QA keys
-        best_match = difflib.get_close_matches(user_input_lower, qa_pairs.keys(), n=1, cutoff=0.4)
-        if best_match:
-            return qa_pairs[best_match[0]]
-        else:
-            unsure_responses = [
-                "🤔 Hmm, I’m not sure about that. Can you describe what your plant looks like?",
-                "🪴 Could you tell me more details — color, spots, or any insects?",
-                "🌿 That’s interesting! Can you mention which plant it is?",
-            ]
-            return random.choice(unsure_responses)
+        st.subheader(tr("💬 Ask PlantDoctor", lang_code))
+
 
     # Initialize chat history
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
 
     user_input_local = st.chat_input(
-            translator.translate("Ask PlantDoctor about your plant...", dest=lang_code).text
+            tr("Ask PlantDoctor about your plant...", lang_code)
         )
 
         # Process only if user entered something
     if user_input_local:
             # Translate user input to English for keyword matching
-            user_input_en = translator.translate(user_input_local, src=lang_code, dest="en").text
+            with metrics.timer("chat_stage", stage="translate_in"):
+                user_input_en = tr(user_input_local, "en", src=lang_code, cache=False)
 
             # Get bot response in English
             bot_reply_en = get_response(user_input_en, lang_code="en")
 
             # Translate bot response back to user's language
-            bot_reply_local = translator.translate(bot_reply_en, dest=lang_code).text
+            with metrics.timer("chat_stage", stage="translate_out"):
+                bot_reply_local = tr(bot_reply_en, lang_code)
 
             # Save chat (session + database)
             st.session_state.chat_history.append(("You", user_input_local))
@@ -351,17 +272,19 @@ elif menu == "Disease Recognition":
 
 
 elif menu == "My History":
-       if not st.session_state["logged_in"]: 
-           st.warning("⚠️ You need to log in first.") 
-       else: 
-           st.subheader("📜 Your Past Predictions") 
-           user_id = get_user_id(st.session_state["username"]) 
-           history = get_user_predictions(user_id)
-       if history: 
-                 for disease, time in history:
-                  st.write(f"🕒 {time} → 🌱 {disease}") 
-                 else: 
-                   st.info("No history available.") 
+    if not st.session_state["logged_in"]:
+        st.warning("⚠️ You need to log in first.")
+    else:
+        st.subheader("📜 Your Past Predictions")
+        user_id = get_user_id(st.session_state["username"])
+        history = get_user_predictions(user_id)
+        if history:
+            for p in history:
+                ts = p.get("timestamp")
+                when = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M") if ts else "unknown time"
+                st.write(f"🕒 {when} → 🌱 {p['disease']}")
+        else:
+            st.info("No history available.")
 
 elif menu == "My Chats":
     if not st.session_state["logged_in"]:
@@ -369,15 +292,26 @@ elif menu == "My Chats":
     else:
         st.subheader("🗂️ Your Chat History")
         user_id = get_user_id(st.session_state["username"])
-        chats = get_user_chats(user_id)
+
+        # newest first, CHAT_PAGE_SIZE at a time; "Load older" keeps the cursors
+        # of the pages already shown so only those are read again
+        cursors = st.session_state.setdefault(f"chat_cursors_{user_id}", [None])
+        chats = []
+        cursor = None
+        for before in cursors:
+            page, cursor = latest_user_chats(user_id, limit=CHAT_PAGE_SIZE, before=before)
+            chats.extend(page)
 
         if chats:
-            for i, c in enumerate(chats):
+            for c in chats:
                 st.markdown(f"**🗣️ You:** {c['user_message']}  \n**🤖 Bot:** {c['bot_reply']}")
-                if st.button("🗑️ Delete", key=f"del_chat_{i}"):
-                    delete_chat_at_index(i, user_id)
+                if st.button("🗑️ Delete", key=f"del_chat_{c['id']}"):
+                    delete_chat(c["id"])
                     st.success("✅ Chat deleted.")
                     st.experimental_rerun()
+            if cursor is not None and st.button("Load older"):
+                cursors.append(cursor)
+                st.experimental_rerun()
         else:
             st.info("No chat history found.")
 
@@ -391,16 +325,15 @@ elif menu == "Admin Dashboard":
 
         # --- ADMIN TOOLS INFO ---
         st.markdown("### 🔐 Admin Tools")
-        st.write("Be careful: deleting a user will remove their account and all their prediction history.")
+        st.write("Be careful: deleting a user will remove their account and all their prediction and chat history.")
 
         # --- ALL USERS ---
         st.markdown("#### 👥 All Users")
-        from user import get_all_users, delete_user
-        from database import delete_predictions_by_user, get_all_predictions, delete_prediction_at_index
 
         users = get_all_users()
         if users:
-            for u in users:
+            offset = pager("user_page", len(users))
+            for u in users[offset:offset + ADMIN_PAGE_SIZE]:
                 uid = u["id"]
                 uname = u["username"]
                 admin_flag = u.get("is_admin", False)
@@ -414,51 +347,96 @@ elif menu == "Admin Dashboard":
                     if uname == st.session_state["username"]:
                         st.error("❌ You cannot delete your own admin account while logged in.")
                     else:
-                        deleted = delete_user(uname)
+                        deleted, n_preds, n_chats = delete_users([uname])
                         if deleted:
-                            removed = delete_predictions_by_user(uid)
-                            st.success(f"User '{uname}' deleted. Removed {removed} prediction(s).")
+                            st.success(f"User '{uname}' deleted. Removed {n_preds} prediction(s) and {n_chats} chat message(s).")
                             st.experimental_rerun()
                         else:
                             st.error("❌ Failed to delete user.")
+            others = [u["username"] for u in users if u["username"] != st.session_state["username"]]
+            selected = st.multiselect("Delete several users", others, key="bulk_delete_users")
+            if selected and st.button("Delete selected users"):
+                n_users, n_preds, n_chats = delete_users(selected)
+                st.success(f"Deleted {n_users} user(s), {n_preds} prediction(s) and {n_chats} chat message(s).")
+                st.experimental_rerun()
+            if st.button("Compact storage"):
+                compact_storage()
+                st.success("Storage compacted.")
         else:
             st.info("No users found.")
 
         st.markdown("---")
 
+        # --- OUTBREAK TRENDS ---
+        st.markdown("#### 📈 Disease Trends")
+        totals = analytics.disease_counts()
+        if totals:
+            week = analytics.daily_counts_many(totals, 7)
+            trend_rows = [
+                {"disease": d, "this week": sum(c for _, c in week[d]),
+                 "today": week[d][-1][1], "all time": n}
+                for d, n in totals.items()
+            ]
+            trend_rows.sort(key=lambda r: r["this week"], reverse=True)
+            st.dataframe(trend_rows, use_container_width=True)
+            trend_disease = st.selectbox("Daily cases for", [r["disease"] for r in trend_rows])
+            st.bar_chart({datetime.fromtimestamp(day).strftime("%m-%d"): n
+                          for day, n in analytics.daily_counts(trend_disease, 14)})
+        else:
+            st.info("No predictions recorded yet.")
+
+        st.markdown("---")
+
         # --- ALL PREDICTIONS ---
         st.markdown("#### 📜 All Predictions")
-        all_preds = get_all_predictions()
-        if all_preds:
-            for i, p in enumerate(all_preds):
+        fcols = st.columns(3)
+        f_user = fcols[0].text_input("Filter by user id", key="pred_f_user").strip()
+        f_disease = fcols[1].text_input("Filter by disease", key="pred_f_disease").strip()
+        f_dates = fcols[2].date_input("Date range", value=(), key="pred_f_dates")
+        since, until = date_range_to_epoch(f_dates)
+        pred_filters = dict(
+            user_id=int(f_user) if f_user.isdigit() else None,
+            disease=f_disease or None,
+            since=since,
+            until=until,
+        )
+        preds, pred_total, offset = paged_query(
+            "pred_page", lambda offset, limit: query_predictions(offset=offset, limit=limit, **pred_filters))
+        if pred_total:
+            for i, p in enumerate(preds, start=offset):
                 line = f"{i}. user_id: {p.get('user_id')} → disease: {p.get('disease')}"
                 cols = st.columns([6,1])
                 cols[0].write(line)
-                if cols[1].button("Delete", key=f"delpred_{i}"):
-                    if delete_prediction_at_index(i):
+                if cols[1].button("Delete", key=f"delpred_{p['id']}"):
+                    if delete_prediction(p["id"]):
                         st.success(f"Deleted prediction #{i}")
-                        st.experimental_rerun()
+                        st.rerun()
                     else:
                         st.error("❌ Failed to delete prediction.")
 
             # Clear all predictions option
             if st.button("Clear all predictions"):
                 if st.button("Confirm: Clear ALL predictions", key="confirm_clear_all"):
-                    with open("predictions.json", "w", encoding="utf-8") as f:
-                        json.dump([], f)
+                    clear_predictions()
                     st.success("✅ All predictions cleared.")
-                    st.experimental_rerun()
+                    st.rerun()
         else:
             st.info("No predictions available yet.")
 
-            if st.subheader("💬 All User Chats"):
-                all_chats = get_all_chats()
-                if all_chats:
-                    for i, c in enumerate(all_chats):
-                        st.markdown(f"👤 User ID: {c['user_id']}  \n🗣️ You: {c['user_message']}  \n🤖 Bot: {c['bot_reply']}")
-                        if st.button("Delete Chat", key=f"adm_del_chat_{i}"):
-                           delete_chat_at_index(i)
-                           st.success("Deleted chat.")
-                           st.rerun()
-                        else:
-                           st.info("No chats available.")
+        st.markdown("---")
+
+        # --- ALL CHATS ---
+        st.subheader("💬 All User Chats")
+        c_user = st.text_input("Filter by user id", key="chat_f_user").strip()
+        chat_filters = dict(user_id=int(c_user) if c_user.isdigit() else None)
+        chats, chat_total, _ = paged_query(
+            "chat_page", lambda offset, limit: query_chats(offset=offset, limit=limit, **chat_filters))
+        if chat_total:
+            for c in chats:
+                st.markdown(f"👤 User ID: {c['user_id']}  \n🗣️ You: {c['user_message']}  \n🤖 Bot: {c['bot_reply']}")
+                if st.button("Delete Chat", key=f"adm_del_chat_{c['id']}"):
+                    delete_chat(c["id"])
+                    st.success("Deleted chat.")
+                    st.rerun()
+        else:
+            st.info("No chats available.")
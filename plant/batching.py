@@ -0,0 +1,98 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+# Collects single-image prediction requests from every Streamlit session in
+# this process into batches, so concurrent uploads share one forward pass.
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10
+
+
+class BatchScheduler:
+    """
+    Micro-batching queue in front of a batch predict function.
+    submit() enqueues one image and returns a Future; a worker thread drains
+    the queue into batches of at most max_batch_size, waiting at most
+    max_wait_ms for a batch to fill, runs predict_fn once per batch and
+    resolves each caller's future with its own row of the output.
+    collate(images) builds the batch array (np.stack by default); images
+    are converted to `dtype` on submit, or kept as they are if it is None.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 collate=np.stack, dtype="float32"):
+        self.predict_fn = predict_fn
+        self.collate = collate
+        self.dtype = dtype
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._batch_sizes = {}
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, image):
+        future = Future()
+        self._queue.put((np.asarray(image, dtype=self.dtype), future))
+        return future
+
+    def predict(self, image, timeout=None):
+        """Blocking helper: predict one image and return its output row."""
+        return self.submit(image).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            live = [(img, f) for img, f in batch if f.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            images = [img for img, _ in live]
+            futures = [f for _, f in live]
+            try:
+                outputs = self.predict_fn(self.collate(images))
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(e)
+            else:
+                for f, out in zip(futures, outputs):
+                    f.set_result(out)
+            self._record(len(futures))
+
+    def _record(self, size):
+        with self._metrics_lock:
+            self._batches += 1
+            self._items += size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+
+    def metrics(self):
+        """Current queue depth and batch-size statistics."""
+        with self._metrics_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch_seen,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
@@ -0,0 +1,85 @@
+"""
+Newest-first chat paging against logs of growing size: time for the first
+page and for the page 10 pages back, and peak traced memory per call.
+
+    python benchmarks/bench_chat_history.py [sizes...]
+
+Paging reads through the per-user offset index, which is built once per
+process by the first lookup and stays resident; its build time, the
+memory it holds (traced) and the RSS growth while building it are
+reported separately. The per-call columns exclude it.
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+from logstore import AppendLog
+
+USERS = 1000
+PAGE = 20
+
+
+def bench(total):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chats.jsonl")
+        synthetic.write_log(path, synthetic.chats(total, USERS))
+        # the index's memory, traced on a throwaway instance (tracing slows the build)
+        tracemalloc.start()
+        AppendLog(path).ids_for(1)
+        index_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        log = AppendLog(path)
+        rss = _rss_bytes()
+        start = time.perf_counter()
+        log.ids_for(1)  # first lookup builds the index
+        build = time.perf_counter() - start
+        rss_growth = _rss_bytes() - rss if rss is not None else None
+
+        def pages(n):
+            before = None
+            for _ in range(n):
+                rows = log.newest(PAGE, key=1, before=before)
+                before = rows[-1][0] if rows else None
+
+        results = []
+        for n in (1, 10):
+            start = time.perf_counter()
+            for _ in range(20):
+                pages(n)
+            elapsed = (time.perf_counter() - start) / 20
+            tracemalloc.start()
+            pages(n)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append((elapsed, peak))
+        return (build, index_bytes, rss_growth), results
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [10_000, 100_000, 1_000_000]
+    print(f"{'records':>10s} {'index s':>8s} {'index MB':>9s} {'RSS +MB':>8s} "
+          f"{'1st page ms':>12s} {'peak KB':>9s} {'10 pages ms':>12s} {'peak KB':>9s}")
+    for total in sizes:
+        (build, index_bytes, rss_growth), [(t1, m1), (t10, m10)] = bench(total)
+        rss = f"{rss_growth / 1e6:8.1f}" if rss_growth is not None else f"{'-':>8s}"
+        print(f"{total:>10d} {build:8.2f} {index_bytes / 1e6:9.1f} {rss} "
+              f"{t1 * 1000:12.3f} {m1 / 1024:9.1f} {t10 * 1000:12.3f} {m10 / 1024:9.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
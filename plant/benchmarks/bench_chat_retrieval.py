@@ -0,0 +1,57 @@
+"""
+Q&A fallback lookup: difflib.get_close_matches vs the n-gram TF-IDF index,
+on synthetic corpora of growing size.
+
+    python benchmarks/bench_chat_retrieval.py [corpus sizes...]
+"""
+import os
+import sys
+import time
+import random
+import difflib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from chat_retrieval import QAIndex
+
+VOCAB = ["yellow", "brown", "black", "white", "leaves", "spots", "tips", "stem", "root", "rot",
+         "wilting", "curling", "powder", "aphids", "mites", "gnats", "soil", "water", "sun", "shade",
+         "tomato", "potato", "rose", "mango", "chilli", "rice", "wheat", "cotton", "banana", "tea"]
+
+QUERIES = ["my tomato has yellow leaves", "brown spots on potato", "how to water mango",
+           "white powder on rose leaves", "aphids on chilli"]
+
+
+def make_corpus(n, rng):
+    corpus = {}
+    while len(corpus) < n:
+        key = " ".join(rng.sample(VOCAB, rng.randint(2, 4))) + f" {len(corpus)}"
+        corpus[key] = f"answer {len(corpus)}"
+    return corpus
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES))
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [100, 1000, 10000, 50000]
+    rng = random.Random(0)
+    print(f"{'entries':>8} {'build (s)':>10} {'difflib (ms)':>13} {'index (ms)':>11}")
+    for n in sizes:
+        corpus = make_corpus(n, rng)
+        start = time.perf_counter()
+        index = QAIndex(corpus)
+        build = time.perf_counter() - start
+        keys = list(corpus)
+        t_difflib = timed(lambda q: difflib.get_close_matches(q, keys, n=1, cutoff=0.4), 1)
+        t_index = timed(lambda q: index.search(q, k=3), 20)
+        print(f"{n:>8} {build:>10.2f} {t_difflib * 1e3:>13.2f} {t_index * 1e3:>11.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
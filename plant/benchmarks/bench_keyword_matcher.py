@@ -0,0 +1,64 @@
+"""
+get_plantdoctor_response keyword matching: nested-loop scan vs the
+Aho-Corasick automaton, on knowledge bases scaled to thousands of diseases.
+
+    python benchmarks/bench_keyword_matcher.py [disease counts...]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from keyword_matcher import AhoCorasick
+
+WORDS = ["leaf", "spot", "rot", "blight", "mold", "rust", "curl", "yellow", "brown", "black",
+         "wilt", "mildew", "canker", "lesion", "ring", "scab", "mosaic", "streak", "gall", "scorch"]
+
+QUERY = ("My tomato leaves have yellow spots with brown rings, some black lesions near the stem "
+         "and the lower leaves started to wilt after the rain last week. What should I do?")
+
+
+def make_diseases(n, rng):
+    diseases = []
+    for i in range(n):
+        keywords = [" ".join(rng.sample(WORDS, 2)) + f" {i}" for _ in range(4)]
+        keywords.append(rng.choice(WORDS) + " " + rng.choice(WORDS))
+        diseases.append({"class": f"Crop{i}___Disease{i}", "keywords": keywords})
+    return diseases
+
+
+def naive(diseases, user_input):
+    found = []
+    for disease in diseases:
+        for keyword in disease["keywords"]:
+            if keyword.lower() in user_input.lower():
+                found.append(disease)
+    return found
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [38, 1000, 5000, 20000]
+    rng = random.Random(0)
+    print(f"{'diseases':>9} {'build (ms)':>11} {'naive (ms)':>11} {'automaton (ms)':>15} {'matches':>8}")
+    for n in sizes:
+        diseases = make_diseases(n, rng)
+        start = time.perf_counter()
+        ac = AhoCorasick((k, i) for i, d in enumerate(diseases) for k in d["keywords"])
+        build = time.perf_counter() - start
+        t_naive, expected = timed(lambda: naive(diseases, QUERY), 5)
+        t_ac, got = timed(lambda: ac.find_all(QUERY), 200)
+        assert sorted(id(d) for d in expected) == sorted(id(diseases[i]) for i in got)
+        print(f"{n:>9} {build * 1e3:>11.1f} {t_naive * 1e3:>11.3f} {t_ac * 1e3:>15.3f} {len(got):>8}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+"""
+Logins per second at different limits on concurrent bcrypt hashes (POOL_SIZE).
+
+    python benchmarks/bench_login.py [--cost 12] [--logins 32] [pool sizes...]
+
+Simulates a burst of sessions logging in at once (one thread per session)
+against a temporary user.json.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import user
+import password_hashing
+
+
+def run(pool_size, logins):
+    password_hashing.configure(pool_size=pool_size)
+    threads = [threading.Thread(target=lambda i=i: user.login_user(f"user{i}", "secret"))
+               for i in range(logins)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return logins / (time.perf_counter() - start)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cost", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("pool_sizes", type=int, nargs="*", default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        password_hashing.configure(work_factor=args.cost)
+        for i in range(args.logins):
+            user.register_user(f"user{i}", "secret")
+        print(f"cost {args.cost}, {args.logins} concurrent logins, {os.cpu_count()} CPUs")
+        print(f"{'pool':>5} {'logins/s':>9}")
+        for size in args.pool_sizes:
+            print(f"{size:>5} {run(size, args.logins):>9.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
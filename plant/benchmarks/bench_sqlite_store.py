@@ -0,0 +1,55 @@
+"""
+SQLite backend at scale: bulk-load N predictions, then time single
+save_prediction calls and get_user_predictions for a user with a fixed
+number of records.
+
+    python benchmarks/bench_sqlite_store.py [sizes...]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlite_store import SQLiteStore
+
+USERS = 1000
+PROBE_USER = -1
+PROBE_RECORDS = 20
+
+
+def bench(total):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteStore(os.path.join(tmp, "bench.db"))
+        every = max(total // PROBE_RECORDS, 1)
+        with store.conn() as conn:
+            conn.executemany(
+                "INSERT INTO predictions (user_id, disease, created_at) VALUES (?, ?, ?)",
+                ((PROBE_USER if i % every == 0 else i % USERS, "Tomato___Late_blight", float(i))
+                 for i in range(1, total + 1)))
+
+        n = 200
+        start = time.perf_counter()
+        for _ in range(n):
+            store.save_prediction(1, "Potato___Early_blight")
+        write = (time.perf_counter() - start) / n
+
+        start = time.perf_counter()
+        for _ in range(n):
+            found = store.get_user_predictions(PROBE_USER)
+        read = (time.perf_counter() - start) / n
+        assert len(found) == PROBE_RECORDS
+    return write, read
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [1000, 10000, 100000, 1000000]
+    print(f"{'rows':>9} {'save (us)':>10} {'user query (us)':>16}")
+    for total in sizes:
+        write, read = bench(total)
+        print(f"{total:>9} {write * 1e6:>10.1f} {read * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,143 @@
+"""
+What the login page pays for before it renders, now (lazy) and with the
+old eager imports.
+
+    python benchmarks/bench_startup.py [--runs 3] [--top 15] [--json out.json]
+
+Each scenario runs in a fresh interpreter under `python -X importtime`:
+
+  lazy       the modules app.py imports at the top level (read from
+             app.py itself), then model_loader.start() as app.py calls
+             it, so the background model load competes with the page
+  no-preload the same with AGROBOT_PRELOAD_MODEL=0, for comparison
+  eager      the same imports plus tensorflow, cv2, numpy, PIL and
+             googletrans and the model load, which app.py used to do
+             before drawing anything
+
+Time to first render is the imports plus a fixed slice of pure-Python
+main-thread work standing in for drawing the page; it is reported split
+into import and render time. The render slice runs slower when the
+loader thread holds the GIL. Streamlit is imported if installed, but no
+page is actually drawn.
+
+Reports wall time per scenario (median of --runs) and the top-level
+packages with the largest cumulative import time. Packages that are not
+installed are listed as missing instead of failing the run.
+"""
+import os
+import ast
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PLANT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RENDER_STEPS = 2_000_000
+
+
+def app_imports(path=os.path.join(PLANT_DIR, "app.py")):
+    """Modules app.py imports at the top level, in order (imports inside pages are left out)."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+LAZY = app_imports()
+EAGER = LAZY + ["numpy", "PIL.Image", "cv2", "googletrans", "tensorflow", "preprocess", "chatbot", "inference"]
+
+SCRIPT = """
+import sys, time, json, importlib
+start = time.perf_counter()
+missing = []
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        missing.append(name)
+if {load_model!r} and "inference" not in missing:
+    try:
+        importlib.import_module("inference").load_model()
+    except Exception as e:
+        missing.append("model: %s" % e)
+if {start_loader!r} and "model_loader" not in missing:
+    importlib.import_module("model_loader").start()
+imported = time.perf_counter()
+x = 0
+for i in range({render_steps!r}):
+    x += i * i
+end = time.perf_counter()
+print(json.dumps({{"seconds": end - start, "import_seconds": imported - start,
+                  "render_seconds": end - imported, "missing": missing}}))
+"""
+
+
+def run_once(modules, load_model, start_loader, env):
+    code = SCRIPT.format(modules=modules, load_model=load_model, start_loader=start_loader,
+                         render_steps=RENDER_STEPS)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PLANT_DIR,
+                          capture_output=True, text=True, check=True, env=dict(os.environ, **env))
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["packages"] = top_level_times(proc.stderr)
+    return result
+
+
+def top_level_times(importtime_output):
+    """Cumulative microseconds per top-level package, from -X importtime output."""
+    totals = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):  # nested import, already counted in its parent
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(cumulative)
+    return totals
+
+
+def scenario(modules, load_model, runs, start_loader=False, env=None):
+    results = [run_once(modules, load_model, start_loader, env or {}) for _ in range(runs)]
+    best = min(results, key=lambda r: r["seconds"])
+    return {
+        "median_seconds": statistics.median(r["seconds"] for r in results),
+        "median_import_seconds": statistics.median(r["import_seconds"] for r in results),
+        "median_render_seconds": statistics.median(r["render_seconds"] for r in results),
+        "missing": best["missing"],
+        "packages_us": dict(sorted(best["packages"].items(), key=lambda kv: -kv[1])),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    report = {
+        "lazy": scenario(LAZY, False, args.runs, start_loader=True, env={"AGROBOT_PRELOAD_MODEL": "1"}),
+        "no-preload": scenario(LAZY, False, args.runs, start_loader=True, env={"AGROBOT_PRELOAD_MODEL": "0"}),
+        "eager": scenario(EAGER, True, args.runs),
+    }
+    for name, r in report.items():
+        print(f"\n{name}: {r['median_seconds'] * 1000:.0f} ms to first render "
+              f"({r['median_import_seconds'] * 1000:.0f} ms imports + "
+              f"{r['median_render_seconds'] * 1000:.0f} ms render; median of {args.runs})")
+        if r["missing"]:
+            print(f"  not installed / failed: {', '.join(r['missing'])}")
+        for package, us in list(r["packages_us"].items())[:args.top]:
+            print(f"  {package:30s} {us / 1000:9.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
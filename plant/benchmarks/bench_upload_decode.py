@@ -0,0 +1,79 @@
+"""
+Upload preprocessing: old temp-file path vs in-memory decode.
+
+    python benchmarks/bench_upload_decode.py [image ...]
+
+Defaults to the sample JPGs in plant/. Reports mean latency and, via
+tracemalloc, the peak of traced (numpy/Python) memory for one run of
+each path. OpenCV's own decode buffers are not traced.
+"""
+import os
+import sys
+import glob
+import time
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+PLANT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PLANT_DIR)
+
+import preprocess
+
+
+class FakeUpload:
+    """Minimal stand-in for streamlit's UploadedFile."""
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        with open(path, "rb") as f:
+            self._data = f.read()
+
+    def getbuffer(self):
+        return memoryview(self._data)
+
+
+def old_path(upload, workdir):
+    save_path = os.path.join(workdir, upload.name)
+    with open(save_path, "wb") as f:
+        f.write(upload.getbuffer())
+    img = cv2.imread(save_path)
+    img = cv2.resize(img, (224, 224))
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = np.array(img).astype("float32") / 255.0
+    return img.reshape(1, 224, 224, 3)
+
+
+def new_path(upload, workdir):
+    return preprocess.prepare(preprocess.read_upload(upload))
+
+
+def measure(fn, upload, workdir, repeat=50):
+    fn(upload, workdir)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(upload, workdir)
+    latency = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(upload, workdir)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency, peak
+
+
+def main(argv):
+    paths = argv or sorted(glob.glob(os.path.join(PLANT_DIR, "*.JPG")))
+    print(f"{'image':<40} {'path':<6} {'latency (ms)':>13} {'peak (KiB)':>11}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for path in paths:
+            upload = FakeUpload(path)
+            for label, fn in (("old", old_path), ("new", new_path)):
+                latency, peak = measure(fn, upload, workdir)
+                print(f"{upload.name[-40:]:<40} {label:<6} {latency * 1e3:>13.2f} {peak / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
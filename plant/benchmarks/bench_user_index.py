@@ -0,0 +1,66 @@
+"""
+Lookup time of get_user_predictions-style queries as the log grows.
+
+    python benchmarks/bench_user_index.py [sizes...]
+
+The probed user always owns the same 20 records, so with the per-user
+offset index the lookup time should stay flat from 1k to 1M total records.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from logstore import AppendLog
+
+PROBE_USER = -1
+PROBE_RECORDS = 20
+USERS = 1000
+
+
+def build_log(path, total):
+    """Write `total` prediction records straight to disk, PROBE_RECORDS of them for PROBE_USER."""
+    every = max(total // PROBE_RECORDS, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, total + 1):
+            user_id = PROBE_USER if i % every == 0 else i % USERS
+            rec = {"user_id": user_id, "disease": "Tomato___Late_blight"}
+            f.write(json.dumps({"id": i, "rec": rec}) + "\n")
+
+
+def bench(total, repeat=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "predictions.jsonl")
+        build_log(path, total)
+        log = AppendLog(path)
+
+        start = time.perf_counter()
+        log.find(PROBE_USER)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            found = log.find(PROBE_USER)
+        lookup = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        scan = [r for r in log.records() if r["user_id"] == PROBE_USER]
+        full_scan = time.perf_counter() - start
+        assert len(found) == len(scan)
+    return {"records": total, "index_build_s": build, "lookup_us": lookup * 1e6,
+            "full_scan_s": full_scan}
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [1000, 10000, 100000, 1000000]
+    print(f"{'records':>10} {'index build (s)':>16} {'lookup (us)':>12} {'full scan (s)':>14}")
+    for total in sizes:
+        r = bench(total)
+        print(f"{r['records']:>10} {r['index_build_s']:>16.3f} {r['lookup_us']:>12.1f} {r['full_scan_s']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
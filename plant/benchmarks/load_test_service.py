@@ -0,0 +1,121 @@
+"""
+Load test for a running inference_service.py: concurrent clients post
+synthetic leaf images and the script reports throughput and latency.
+
+    python inference_service.py --workers 4 &
+    python benchmarks/load_test_service.py [--url http://127.0.0.1:8601]
+        [--concurrency 1,4,16] [--requests 200] [--images 32] [--size 256]
+        [--out load_test.json]
+
+Each concurrency level runs --requests predictions spread over that many
+threads sharing one pooled InferenceClient, after a short warm-up.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import synthetic
+from inference_client import InferenceClient, ServiceError
+
+
+def wait_ready(client, timeout=300):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if client.health().get("status") == "ok":
+                return
+        except ServiceError:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"service at {client.url} not ready after {timeout}s")
+        time.sleep(0.5)
+
+
+def run(client, images, concurrency, total):
+    """Send `total` predictions from `concurrency` threads; returns the result row."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        own = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            try:
+                client.predict(images[i % len(images)])
+            except ServiceError as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": len(errors),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Load test a local inference service.")
+    parser.add_argument("--url", default=os.environ.get("AGROBOT_INFERENCE_URL", "http://127.0.0.1:8601"))
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=200, help="predictions per concurrency level")
+    parser.add_argument("--images", type=int, default=32, help="distinct synthetic images")
+    parser.add_argument("--size", type=int, default=256, help="image side in pixels")
+    parser.add_argument("--out", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    images = list(synthetic.leaf_images(args.images, (args.size, args.size)))
+    client = InferenceClient(args.url, pool_size=max(levels))
+    wait_ready(client)
+    health = client.health()
+    run(client, images, max(levels), min(args.requests, 2 * max(levels)))  # warm-up
+
+    print(f"{args.url}: {health.get('workers')} worker(s), {len(images)} images of {args.size}px")
+    print(f"{'clients':>8s} {'req/s':>9s} {'p50 ms':>9s} {'p99 ms':>9s} {'max ms':>9s} {'errors':>7s}")
+    results = []
+    for level in levels:
+        r = run(client, images, level, args.requests)
+        results.append(r)
+        print(f"{level:8d} {r['throughput_rps']:9.1f} {r['p50_ms']:9.2f} {r['p99_ms']:9.2f} "
+              f"{r['max_ms']:9.2f} {r['errors']:7d}")
+    client.close()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "health": health, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
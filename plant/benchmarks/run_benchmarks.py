@@ -0,0 +1,309 @@
+"""
+Benchmark harness for the hot paths, writing machine-readable JSON.
+
+    python benchmarks/run_benchmarks.py [--scale 10000] [--backend json|sqlite]
+        [--only storage,login,chat,model] [--out results.json]
+
+Builds a synthetic dataset of `--scale` predictions and chats (1k to 1M)
+in a temporary directory, then measures:
+
+  storage  cold index load, save_prediction / save_chat_message
+           throughput (group commit included), get_user_predictions latency
+  login    login_user latency at the configured bcrypt work factor
+  chat     get_plantdoctor_response and get_response replies per second
+  model    model_predict latency per stage: cache lookup, decode,
+           preprocess, forward pass, end to end
+
+Latencies are in milliseconds. Compare two result files with
+`--compare old.json` to print the relative change of every metric.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+PLANT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PLANT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+
+DATA_FILES = ["plant_diseases.json", "qa_pairs.json"]
+SUITES = ["storage", "login", "chat", "model"]
+
+
+def latency(samples):
+    """Summary of a list of durations in seconds, reported in milliseconds."""
+    s = sorted(samples)
+    n = len(s)
+    if not n:
+        return {"count": 0}
+
+    def pct(p):
+        return s[min(int(p * n), n - 1)] * 1000
+
+    return {"count": n, "mean_ms": sum(s) / n * 1000, "p50_ms": pct(0.50),
+            "p90_ms": pct(0.90), "p99_ms": pct(0.99), "max_ms": s[-1] * 1000}
+
+
+def timed(fn, args_list):
+    """Run fn(*args) for each args, return (per-call durations, total seconds)."""
+    samples = []
+    start = time.perf_counter()
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t)
+    return samples, time.perf_counter() - start
+
+
+# ---------- suites ----------
+
+def bench_storage(args, rng):
+    import database
+    n_users = args.users
+    ops = min(args.ops, args.scale)
+
+    def writes(fn, make):
+        calls = [make(i) for i in range(ops)]
+        start = time.perf_counter()
+        for call in calls:
+            fn(*call)
+        database.flush()
+        elapsed = time.perf_counter() - start
+        return {"ops": ops, "seconds": elapsed, "ops_per_sec": ops / elapsed}
+
+    # first access replays the logs to build the per-user index; reported
+    # on its own so it does not skew the per-operation numbers
+    start = time.perf_counter()
+    database.get_user_predictions(1)
+    database.get_user_chats(1)
+    cold = time.perf_counter() - start
+
+    diseases = synthetic.CLASS_NAMES
+    results = {
+        "cold_load_seconds": cold,
+        "save_prediction": writes(database.save_prediction,
+                                  lambda i: (rng.randint(1, n_users), rng.choice(diseases))),
+        "save_chat_message": writes(database.save_chat_message,
+                                    lambda i: (rng.randint(1, n_users), "hello", "Hi there!")),
+    }
+    samples, elapsed = timed(database.get_user_predictions,
+                             [(rng.randint(1, n_users),) for _ in range(ops)])
+    results["get_user_predictions"] = dict(latency(samples), ops_per_sec=ops / elapsed)
+    return results
+
+
+def bench_login(args, rng):
+    import user
+    samples, _ = timed(user.login_user, [(f"user{rng.randint(1, args.users)}", "secret")
+                                         for _ in range(args.logins)])
+    return {"login_user": dict(latency(samples), work_factor=args.work_factor)}
+
+
+def bench_chat(args, rng):
+    import chatbot
+    queries = [(q,) for q in synthetic.chat_queries(args.queries, seed=args.seed)]
+    chatbot.get_response("warm up")  # index build is a one-off per process
+    results = {}
+    for name, fn in [("get_plantdoctor_response", chatbot.get_plantdoctor_response),
+                     ("get_response", chatbot.get_response)]:
+        samples, elapsed = timed(fn, queries)
+        results[name] = dict(latency(samples), replies_per_sec=len(queries) / elapsed)
+    return results
+
+
+def bench_model(args, rng):
+    import preprocess
+    from prediction_cache import PredictionCache
+
+    images = list(synthetic.leaf_images(args.images, size=(args.image_size, args.image_size), seed=args.seed))
+    model_path = os.path.join(PLANT_DIR, "CNN_plant_disease_model.keras")
+    cache = PredictionCache(model_path)
+    stages = {"cache_lookup": [], "decode": [], "preprocess": [], "predict": [], "end_to_end": []}
+    results = {"images": len(images), "image_size": args.image_size}
+
+    try:
+        import inference
+        inference.load_model(model_path)
+    except Exception as e:  # tensorflow missing or model unreadable: time the CPU stages only
+        inference = None
+        results["predict_skipped"] = f"{type(e).__name__}: {e}"
+
+    for data in images:
+        start = time.perf_counter()
+        cache.get(data)
+        t1 = time.perf_counter()
+        img = preprocess.decode_image(data)
+        t2 = time.perf_counter()
+        img = preprocess.prepare(img)
+        t3 = time.perf_counter()
+        if inference is not None:
+            inference.predict_one(img)
+        t4 = time.perf_counter()
+        stages["cache_lookup"].append(t1 - start)
+        stages["decode"].append(t2 - t1)
+        stages["preprocess"].append(t3 - t2)
+        if inference is not None:
+            stages["predict"].append(t4 - t3)
+        stages["end_to_end"].append(t4 - start)
+
+    # uint8 graph input (predict_one_raw): no float copy on the host, and
+    # batched images are resized into a reused uint8 buffer
+    stages.update({"raw_predict": [], "raw_end_to_end": [], "float_batch": [], "raw_batch": []})
+    for data in images:
+        start = time.perf_counter()
+        cache.get(data)
+        img = preprocess.decode_image(data)
+        t1 = time.perf_counter()
+        if inference is not None:
+            inference.predict_one_raw(img)
+        t2 = time.perf_counter()
+        if inference is not None:
+            stages["raw_predict"].append(t2 - t1)
+        stages["raw_end_to_end"].append(t2 - start)
+
+    # host-side batch building per image, without the model: float32
+    # prepare() + stack (old path) vs the uint8 BatchBuffer (raw path)
+    from batching import MAX_BATCH_SIZE
+    import numpy as np
+    decoded = [preprocess.decode_image(data) for data in images]
+    buffer = preprocess.BatchBuffer(MAX_BATCH_SIZE)
+    for i in range(0, len(decoded), MAX_BATCH_SIZE):
+        chunk = decoded[i:i + MAX_BATCH_SIZE]
+        start = time.perf_counter()
+        np.stack([preprocess.prepare(img) for img in chunk])
+        t1 = time.perf_counter()
+        buffer.fill(chunk)
+        t2 = time.perf_counter()
+        stages["float_batch"].append((t1 - start) / len(chunk))
+        stages["raw_batch"].append((t2 - t1) / len(chunk))
+
+    results.update({name: latency(samples) for name, samples in stages.items() if samples})
+    return results
+
+
+# ---------- setup ----------
+
+def build_dataset(args, workdir):
+    """Write the synthetic users, predictions and chats for the chosen backend."""
+    import password_hashing
+    password_hashing.configure(work_factor=args.work_factor)
+    password_hash = password_hashing.hash_password("secret")
+
+    users = synthetic.users(args.users, password_hash, seed=args.seed)
+    predictions = synthetic.predictions(args.scale, args.users, seed=args.seed)
+    chats = synthetic.chats(args.scale, args.users, seed=args.seed + 1)
+    if args.backend == "sqlite":
+        import sqlite_store
+        synthetic.load_sqlite(sqlite_store.get_store(), users, predictions, chats)
+    else:
+        synthetic.write_users(os.path.join(workdir, "user.json"), users)
+        synthetic.write_log(os.path.join(workdir, "predictions.jsonl"), predictions)
+        synthetic.write_log(os.path.join(workdir, "chats.jsonl"), chats)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PLANT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="agrobot-bench-")
+    cwd = os.getcwd()
+    out = os.path.abspath(args.out)
+    # storage modules resolve their files relative to the working directory
+    # and pick the backend at import time, so both are set before importing them
+    os.environ["AGROBOT_STORAGE"] = args.backend
+    os.environ["AGROBOT_DB"] = os.path.join(workdir, "agrobot.db")
+    try:
+        for name in DATA_FILES:
+            shutil.copy(os.path.join(PLANT_DIR, name), workdir)
+        os.chdir(workdir)
+
+        start = time.perf_counter()
+        build_dataset(args, workdir)
+        report = {
+            "meta": {
+                "timestamp": time.time(),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "args": vars(args),
+                "dataset_build_seconds": time.perf_counter() - start,
+            },
+            "results": {},
+        }
+        suites = {"storage": bench_storage, "login": bench_login, "chat": bench_chat, "model": bench_model}
+        for name in args.only:
+            rng = random.Random(args.seed)
+            print(f"running {name} ...", file=sys.stderr)
+            report["results"][name] = suites[name](args, rng)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+# ---------- comparison ----------
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(old, new):
+    before = dict(flatten(old["results"]))
+    for key, value in flatten(new["results"]):
+        if key in before and before[key]:
+            change = (value - before[key]) / before[key] * 100
+            print(f"{key:55s} {before[key]:12.3f} -> {value:12.3f}  {change:+7.1f}%")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10_000, help="predictions and chats in the dataset")
+    parser.add_argument("--users", type=int, default=None, help="default: scale / 10")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--only", default=",".join(SUITES), help="comma-separated suites")
+    parser.add_argument("--ops", type=int, default=2000, help="timed storage operations")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--work-factor", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--image-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print changes against an earlier result file")
+    args = parser.parse_args(argv)
+    args.users = args.users or max(args.scale // 10, 1)
+    args.only = [s for s in args.only.split(",") if s]
+    unknown = set(args.only) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    report = run(args)
+    print(json.dumps(report["results"], indent=2))
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+"""
+Stress test for the append logs: N writer processes x M threads each
+append records to the same file at once; afterwards every record must be
+present exactly once.
+
+    python benchmarks/stress_concurrent_writes.py [--procs 4] [--threads 8] [--records 250]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from logstore import AppendLog
+
+
+def writer_process(path, proc, threads, records):
+    log = AppendLog(path)
+
+    def write(thread):
+        for i in range(records):
+            log.append({"user_id": proc, "thread": thread, "n": i})
+
+    workers = [threading.Thread(target=write, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    log.flush()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--records", type=int, default=250)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chats.jsonl")
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=writer_process,
+                                         args=(path, p, args.threads, args.records))
+                 for p in range(args.procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        entries = AppendLog(path).entries()
+        expected = args.procs * args.threads * args.records
+        seen = {(r["user_id"], r["thread"], r["n"]) for _, r in entries}
+        ids = [rid for rid, _ in entries]
+        print(f"{expected} records from {args.procs} processes x {args.threads} threads "
+              f"in {elapsed:.2f}s ({expected / elapsed:.0f}/s)")
+        print(f"found {len(entries)} records, {len(seen)} unique, {len(set(ids))} unique ids")
+        ok = len(entries) == len(seen) == len(set(ids)) == expected
+        print("OK" if ok else "LOST OR DUPLICATED RECORDS")
+        return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
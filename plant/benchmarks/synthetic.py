@@ -0,0 +1,137 @@
+"""
+Synthetic data for the benchmarks: users, predictions, chats, chat
+queries and leaf images, deterministic for a given seed.
+
+Bulk data is written straight into the on-disk formats (user.json, the
+JSON Lines logs, or the SQLite tables) instead of going through the
+public API, so a 1M-record dataset takes seconds to build and the timed
+part of a benchmark starts from a realistic, already-populated store.
+"""
+import os
+import json
+import random
+
+import cv2
+import numpy as np
+
+PLANT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+REGIONS = ["north", "south", "east", "west", "central"]
+
+CHAT_TEMPLATES = [
+    "my {plant} leaves have {keyword}",
+    "what should I do about {keyword} on my {plant}?",
+    "I see {keyword}, is it serious",
+    "hello",
+    "thank you so much",
+    "how often should I water my {plant}",
+    "which fertilizer is best for {plant}",
+    "tell me a joke",
+    "asdf qwerty zxcv",
+]
+
+
+def load_diseases(path=None):
+    """The disease entries of plant_diseases.json."""
+    path = path or os.path.join(PLANT_DIR, "plant_diseases.json")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["plant_diseases"]
+
+
+DISEASES = load_diseases()
+CLASS_NAMES = [d["class"] for d in DISEASES]
+KEYWORDS = [k for d in DISEASES for k in d["keywords"]]
+PLANTS = sorted({c.split("___")[0].split("_(")[0].replace("_", " ").lower() for c in CLASS_NAMES})
+
+
+def users(n, password_hash, seed=0):
+    """{username: record} for n users sharing one precomputed password hash."""
+    rng = random.Random(seed)
+    return {
+        f"user{i}": {"password": password_hash, "is_admin": rng.random() < 0.01, "id": i}
+        for i in range(1, n + 1)
+    }
+
+
+def predictions(n, n_users, seed=0, start=1_700_000_000.0, span=90 * 86400):
+    """n prediction records spread over n_users and `span` seconds."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "user_id": rng.randint(1, n_users),
+            "disease": rng.choice(CLASS_NAMES),
+            "region": rng.choice(REGIONS),
+            "timestamp": start + span * i / max(n, 1),
+        }
+
+
+def chat_queries(n, seed=0):
+    """n chat inputs: disease keywords, small talk, Q&A-like questions and noise."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield rng.choice(CHAT_TEMPLATES).format(plant=rng.choice(PLANTS), keyword=rng.choice(KEYWORDS))
+
+
+def chats(n, n_users, seed=0, start=1_700_000_000.0, span=90 * 86400):
+    """n chat records spread over n_users."""
+    rng = random.Random(seed)
+    queries = chat_queries(n, seed)
+    for i in range(n):
+        yield {
+            "user_id": rng.randint(1, n_users),
+            "user_message": next(queries),
+            "bot_reply": "Disease: %s" % rng.choice(CLASS_NAMES),
+            "timestamp": start + span * i / max(n, 1),
+        }
+
+
+def leaf_image(size=(256, 256), seed=0):
+    """JPEG bytes of a green leaf-like blob with brown lesions on a noisy background."""
+    rng = np.random.default_rng(seed)
+    h, w = size
+    img = rng.integers(60, 120, (h, w, 3), dtype=np.uint8)
+    center = (w // 2, h // 2)
+    axes = (int(w * rng.uniform(0.3, 0.45)), int(h * rng.uniform(0.2, 0.35)))
+    cv2.ellipse(img, center, axes, float(rng.uniform(0, 180)), 0, 360,
+                tuple(int(c) for c in rng.integers([20, 110, 20], [60, 200, 70])), -1)
+    for _ in range(int(rng.integers(3, 15))):
+        spot = (int(rng.integers(w // 4, 3 * w // 4)), int(rng.integers(h // 4, 3 * h // 4)))
+        cv2.circle(img, spot, int(rng.integers(2, max(w // 20, 3))), (30, 60, 110), -1)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return buf.tobytes()
+
+
+def leaf_images(n, size=(256, 256), seed=0):
+    for i in range(n):
+        yield leaf_image(size, seed + i)
+
+
+# ---------- writers ----------
+
+def write_users(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+
+def write_log(path, records):
+    """Write records as an AppendLog file (ids from 1), returns the count."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for n, rec in enumerate(records, 1):
+            f.write(json.dumps({"id": n, "rec": rec}, ensure_ascii=False) + "\n")
+    return n
+
+
+def load_sqlite(store, user_records=None, prediction_records=(), chat_records=()):
+    """Bulk insert into a SQLiteStore in one transaction per table."""
+    with store.conn() as conn:
+        if user_records:
+            conn.executemany(
+                "INSERT INTO users (id, username, password, is_admin) VALUES (?, ?, ?, ?)",
+                ((u["id"], name, u["password"], int(u["is_admin"])) for name, u in user_records.items()))
+        conn.executemany(
+            "INSERT INTO predictions (user_id, disease, region, created_at) VALUES (?, ?, ?, ?)",
+            ((p["user_id"], p["disease"], p["region"], p["timestamp"]) for p in prediction_records))
+        conn.executemany(
+            "INSERT INTO chats (user_id, user_message, bot_reply, created_at) VALUES (?, ?, ?, ?)",
+            ((c["user_id"], c["user_message"], c["bot_reply"], c["timestamp"]) for c in chat_records))
@@ -0,0 +1,110 @@
+import os
+import json
+import math
+import threading
+from collections import Counter
+
+import numpy as np
+
+# PlantDoctor Q&A fallback. The corpus lives in qa_pairs.json and is
+# indexed once per process as character n-gram TF-IDF vectors with an
+# inverted index, so a query only touches entries sharing n-grams with it.
+QA_FILE = "qa_pairs.json"
+NGRAM = 3
+MIN_SCORE = 0.3
+# n-grams found in more than this share of entries carry almost no signal
+# and have the longest posting lists, so they are left out of the index
+MAX_DF_RATIO = 0.5
+
+
+def ngrams(text, n=NGRAM):
+    text = f" {' '.join(text.lower().split())} "
+    return Counter(text[i:i + n] for i in range(max(len(text) - n + 1, 1)))
+
+
+class QAIndex:
+
+    def __init__(self, pairs):
+        self.pairs = dict(pairs)
+        self._keys = list(self.pairs)
+        grams = [ngrams(k) for k in self._keys]
+        df = Counter(g for doc in grams for g in doc)
+        n_docs = len(self._keys)
+        max_df = max(MAX_DF_RATIO * n_docs, 1)
+        self._idf = {g: math.log((n_docs + 1) / (c + 1)) + 1 for g, c in df.items() if c <= max_df}
+        postings = {}
+        norms = np.ones(n_docs, dtype="float32")
+        for doc_id, doc in enumerate(grams):
+            norm = 0.0
+            for g, tf in doc.items():
+                idf = self._idf.get(g)
+                if idf is None:
+                    continue
+                w = (1 + math.log(tf)) * idf
+                postings.setdefault(g, ([], []))
+                postings[g][0].append(doc_id)
+                postings[g][1].append(w)
+                norm += w * w
+            if norm:
+                norms[doc_id] = math.sqrt(norm)
+        # posting lists as arrays, with weights already divided by the doc norm
+        self._postings = {
+            g: (np.asarray(ids, dtype="int32"), np.asarray(ws, dtype="float32") / norms[ids])
+            for g, (ids, ws) in postings.items()
+        }
+
+    def answer(self, key):
+        return self.pairs[key]
+
+    def search(self, query, k=1, min_score=MIN_SCORE):
+        """Top-k (key, answer, score) by cosine similarity, best first."""
+        ids, weights = [], []
+        q_norm = 0.0
+        for g, tf in ngrams(query).items():
+            posting = self._postings.get(g)
+            if posting is None:
+                continue
+            qw = (1 + math.log(tf)) * self._idf[g]
+            q_norm += qw * qw
+            ids.append(posting[0])
+            weights.append(posting[1] * qw)
+        if not ids:
+            return []
+        ids = np.concatenate(ids)
+        weights = np.concatenate(weights)
+        if len(ids) * 8 < len(self._keys):
+            # few postings: score them on compact indices, so the work
+            # follows the postings touched rather than the corpus size
+            candidates, slots = np.unique(ids, return_inverse=True)
+            scores = np.bincount(slots, weights=weights)
+        else:
+            # the postings already cover much of the corpus, so a dense
+            # accumulator costs no more than they do, and skips the sort
+            candidates = None
+            scores = np.bincount(ids, weights=weights)
+        scores /= math.sqrt(q_norm)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        docs = top if candidates is None else candidates[top]
+        return [(self._keys[d], self.pairs[self._keys[d]], float(s))
+                for d, s in zip(docs, scores[top]) if s >= min_score]
+
+_indexes = {}  # corpus path -> ((mtime_ns, size), QAIndex)
+_lock = threading.Lock()
+
+
+def get_index(path=QA_FILE):
+    """Process-wide QAIndex per corpus file, rebuilt only when that file changes."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _indexes.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _indexes.get(path)
+        if cached is None or cached[0] != version:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = _indexes[path] = (version, QAIndex(json.load(f)["qa_pairs"]))
+    return cached[1]
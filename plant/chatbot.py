@@ -0,0 +1,66 @@
+import random
+
+import metrics
+from translation import tr
+from keyword_matcher import get_knowledge_base
+from chat_retrieval import get_index as get_qa_index
+
+# PlantDoctor reply logic, kept out of app.py so it can be exercised
+# without a Streamlit session (benchmarks, batch tools).
+PLANT_DISEASES_FILE = "plant_diseases.json"
+DEFAULT_MSG = "Sorry, I couldn't identify the plant disease. Please try again or upload an image."
+
+UNSURE_RESPONSES = [
+    "🤔 Hmm, I’m not sure about that. Can you describe what your plant looks like?",
+    "🪴 Could you tell me more details — color, spots, or any insects?",
+    "🌿 That’s interesting! Can you mention which plant it is?",
+]
+
+
+@metrics.timed("chat_stage", stage="plantdoctor")
+def get_plantdoctor_response(user_input, lang_code="en"):
+    # One pass over the input finds every matching disease; only the
+    # response that is actually returned gets translated.
+    response_text = get_knowledge_base(PLANT_DISEASES_FILE).respond(user_input)
+    if response_text is None:
+        response_text = DEFAULT_MSG
+    if lang_code != "en":
+        response_text = tr(response_text, lang_code)
+    return response_text
+
+
+@metrics.timed("chat_stage", stage="reply")
+def get_response(user_input, lang_code="en"):
+    user_input_lower = user_input.lower()
+
+    # 1️⃣ First, check the plant_diseases JSON keywords
+    with metrics.timer("chat_stage", stage="keywords"):
+        response_text = get_knowledge_base(PLANT_DISEASES_FILE).respond(user_input)
+    if response_text is not None:
+        return tr(response_text, lang_code) if lang_code != "en" else response_text
+
+    # Q&A Knowledge Base (qa_pairs.json, indexed once per process)
+    qa_index = get_qa_index()
+
+    # Basic conversation triggers
+    if any(word in user_input_lower for word in ["hi", "hello", "hey"]):
+        return qa_index.answer("greeting")
+    if "thank" in user_input_lower:
+        return qa_index.answer("thanks")
+    if "who are you" in user_input_lower or "your name" in user_input_lower:
+        return qa_index.answer("who are you")
+    if "bye" in user_input_lower or "goodbye" in user_input_lower:
+        return qa_index.answer("bye")
+    if "joke" in user_input_lower:
+        return qa_index.answer("joke")
+    if "motivate" in user_input_lower or "motivation" in user_input_lower:
+        return qa_index.answer("motivation")
+    if "love" in user_input_lower and "plant" in user_input_lower:
+        return qa_index.answer("love plants")
+
+    # Best match from QA keys
+    with metrics.timer("chat_stage", stage="qa_search"):
+        best_match = qa_index.search(user_input_lower, k=1)
+    if best_match:
+        return best_match[0][1]
+    return random.choice(UNSURE_RESPONSES)
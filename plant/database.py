@@ -1,26 +1,43 @@
-import os
-import json
+import time
 
-PREDICTIONS_FILE = "predictions.json"
+import metrics
+import sqlite_store
+from logstore import AppendLog
+
+# Predictions and chats are kept in append-only JSON Lines logs, so a write
+# is a single append instead of a rewrite of the whole history. The old
+# JSON array files are imported automatically the first time.
+PREDICTIONS_FILE = "predictions.jsonl"
+LEGACY_PREDICTIONS_FILE = "predictions.json"
+
+_predictions = AppendLog(PREDICTIONS_FILE, legacy_path=LEGACY_PREDICTIONS_FILE)
 
 
 def load_predictions():
-    if not os.path.exists(PREDICTIONS_FILE) or os.stat(PREDICTIONS_FILE).st_size == 0:
-        return []
-    with open(PREDICTIONS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _predictions.records()
+
 
+def save_prediction(user_id, disease, region=None):
+    record = {"user_id": user_id, "disease": disease, "timestamp": time.time()}
+    if region:
+        record["region"] = region
+    _predictions.append(record)
 
-def save_prediction(user_id, disease):
-    predictions = load_predictions()
-    predictions.append({"user_id": user_id, "disease": disease})
-    with open(PREDICTIONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(predictions, f, indent=4)
+
+def save_predictions(user_id, diseases, region=None):
+    """Save many predictions for one user in a single commit. Returns the count."""
+    now = time.time()
+    records = []
+    for disease in diseases:
+        record = {"user_id": user_id, "disease": disease, "timestamp": now}
+        if region:
+            record["region"] = region
+        records.append(record)
+    return _predictions.extend(records)
 
 
 def get_user_predictions(user_id):
-    predictions = load_predictions()
-    return [p for p in predictions if p["user_id"] == user_id]
+    return [p for _, p in _predictions.find(user_id)]
 
 # Add these to database.py (append at end)
 
@@ -33,74 +50,174 @@ def delete_predictions_by_user(user_id):
     Remove all predictions for a given user_id.
     Returns number of removed items.
     """
-    predictions = load_predictions()
-    before = len(predictions)
-    predictions = [p for p in predictions if p.get("user_id") != user_id]
-    with open(PREDICTIONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(predictions, f, indent=4)
-    return before - len(predictions)
+    return _predictions.delete(_predictions.ids_for(user_id))
 
 def delete_prediction_at_index(idx):
     """
     Delete a single prediction by its index in the list returned by load_predictions().
     Useful for admin removing single records. Returns True if removed.
     """
-    predictions = load_predictions()
-    if 0 <= idx < len(predictions):
-        predictions.pop(idx)
-        with open(PREDICTIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(predictions, f, indent=4)
+    entries = _predictions.entries()
+    if 0 <= idx < len(entries):
+        _predictions.delete([entries[idx][0]])
         return True
     return False
 
-CHAT_FILE = "chats.json"
+def clear_predictions():
+    """Remove every prediction."""
+    _predictions.rewrite([])
+
+def _matches(disease=None, since=None, until=None):
+    """Record filter for the query_* functions, or None when nothing is filtered."""
+    if disease is None and since is None and until is None:
+        return None
+
+    def predicate(rec):
+        if disease is not None and rec.get("disease") != disease:
+            return False
+        if since is not None or until is not None:
+            ts = rec.get("timestamp")
+            if ts is None:
+                return False
+            if since is not None and ts < since:
+                return False
+            if until is not None and ts >= until:
+                return False
+        return True
+    return predicate
+
+def _page(log, offset, limit, user_id, predicate):
+    if user_id is None:
+        rows, total = log.page(offset, limit, predicate=predicate)
+    else:
+        rows, total = log.page(offset, limit, key=user_id, predicate=predicate)
+    return [dict(rec, id=rid) for rid, rec in rows], total
+
+def query_predictions(offset=0, limit=50, user_id=None, disease=None, since=None, until=None):
+    """
+    One page of predictions plus the total number of matches: (rows, total).
+    Filters are optional; since/until are epoch seconds (until exclusive).
+    Each row carries its record "id", for delete_prediction().
+    """
+    return _page(_predictions, offset, limit, user_id, _matches(disease, since, until))
+
+def delete_prediction(record_id):
+    """Delete one prediction by record id. Returns True if removed."""
+    return _predictions.delete([record_id]) > 0
+
+CHAT_FILE = "chats.jsonl"
+LEGACY_CHAT_FILE = "chats.json"
+
+_chats = AppendLog(CHAT_FILE, legacy_path=LEGACY_CHAT_FILE)
 
 def load_chats():
-    if not os.path.exists(CHAT_FILE) or os.stat(CHAT_FILE).st_size == 0:
-        return []
-    try:
-        with open(CHAT_FILE, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return []
+    return _chats.records()
 
 
 def save_chats(chats):
-    with open(CHAT_FILE, "w", encoding="utf-8") as f:
-        json.dump(chats, f, indent=2)
+    _chats.rewrite(chats)
 
 def save_chat_message(user_id, user_message, bot_reply):
-    chats = load_chats()
-    chats.append({
+    _chats.append({
         "user_id": user_id,
         "user_message": user_message,
-        "bot_reply": bot_reply
+        "bot_reply": bot_reply,
+        "timestamp": time.time()
     })
-    save_chats(chats)
 
 def get_user_chats(user_id):
-    return [c for c in load_chats() if c["user_id"] == user_id]
+    return [c for _, c in _chats.find(user_id)]
 
 def get_all_chats():
     return load_chats()
 
 def delete_chat_at_index(index, user_id=None):
-    chats = load_chats()
     if user_id is not None:
-        user_chats = [c for c in chats if c["user_id"] == user_id]
-        if index < len(user_chats):
-            target = user_chats[index]
-            chats.remove(target)
-            save_chats(chats)
-            return True
-        return False
-    if 0 <= index < len(chats):
-        del chats[index]
-        save_chats(chats)
+        ids = _chats.ids_for(user_id)
+    else:
+        ids = [rid for rid, _ in _chats.entries()]
+    if 0 <= index < len(ids):
+        _chats.delete([ids[index]])
         return True
     return False
 
 def delete_chats_by_user(user_id):
-    chats = [c for c in load_chats() if c["user_id"] != user_id]
-    save_chats(chats)
+    _chats.delete(_chats.ids_for(user_id))
     return True
+
+def delete_for_users(user_ids):
+    """
+    Remove every prediction and chat of the given users in one batch:
+    the record ids come from the per-user index and each log gets a
+    single append of tombstones. Space is reclaimed by compaction.
+    Returns (predictions removed, chats removed).
+    """
+    user_ids = list(user_ids)
+    pred_ids = [rid for uid in user_ids for rid in _predictions.ids_for(uid)]
+    chat_ids = [rid for uid in user_ids for rid in _chats.ids_for(uid)]
+    return _predictions.delete(pred_ids), _chats.delete(chat_ids)
+
+def query_chats(offset=0, limit=50, user_id=None, since=None, until=None):
+    """One page of chats plus the total number of matches: (rows, total). See query_predictions()."""
+    return _page(_chats, offset, limit, user_id, _matches(since=since, until=until))
+
+def latest_user_chats(user_id, limit=20, before=None):
+    """
+    A user's newest chats first: (rows with "id", cursor). Pass the cursor
+    back as `before` to get the next older page; it is None on the last page.
+    """
+    rows = _chats.newest(limit + 1, key=user_id, before=before)
+    cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return [dict(rec, id=rid) for rid, rec in rows[:limit]], cursor
+
+def delete_chat(record_id):
+    """Delete one chat message by record id. Returns True if removed."""
+    return _chats.delete([record_id]) > 0
+
+def flush():
+    """Write queued appends of both logs now instead of at the next group commit."""
+    _predictions.flush()
+    _chats.flush()
+
+def compact():
+    """Fold tombstones out of both logs."""
+    _predictions.compact()
+    _chats.compact()
+
+# With AGROBOT_STORAGE=sqlite the same functions are served by SQLite
+# instead of the JSON Lines logs above.
+if sqlite_store.STORAGE_BACKEND == "sqlite":
+    _db = sqlite_store.get_store()
+    load_predictions = _db.load_predictions
+    save_prediction = _db.save_prediction
+    save_predictions = _db.save_predictions
+    get_user_predictions = _db.get_user_predictions
+    get_all_predictions = _db.load_predictions
+    delete_predictions_by_user = _db.delete_predictions_by_user
+    delete_prediction_at_index = _db.delete_prediction_at_index
+    clear_predictions = _db.clear_predictions
+    load_chats = _db.load_chats
+    save_chats = _db.save_chats
+    save_chat_message = _db.save_chat_message
+    get_user_chats = _db.get_user_chats
+    get_all_chats = _db.load_chats
+    delete_chat_at_index = _db.delete_chat_at_index
+    delete_chats_by_user = _db.delete_chats_by_user
+    query_predictions = _db.query_predictions
+    delete_prediction = _db.delete_prediction
+    query_chats = _db.query_chats
+    latest_user_chats = _db.latest_user_chats
+    delete_chat = _db.delete_chat
+    delete_for_users = _db.delete_for_users
+    flush = _db.flush
+    compact = _db.compact
+
+# Per-operation latency (and, through the histogram counts, operation
+# counters) for whichever backend is active.
+for _name in ["save_prediction", "save_predictions", "get_user_predictions", "get_all_predictions",
+              "delete_predictions_by_user", "delete_prediction_at_index", "clear_predictions",
+              "save_chats", "save_chat_message", "get_user_chats", "get_all_chats",
+              "delete_chat_at_index", "delete_chats_by_user", "query_predictions",
+              "delete_prediction", "query_chats", "latest_user_chats", "delete_chat",
+              "delete_for_users", "compact"]:
+    globals()[_name] = metrics.timed("storage_op", op=_name, backend=sqlite_store.STORAGE_BACKEND)(globals()[_name])
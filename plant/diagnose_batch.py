@@ -0,0 +1,165 @@
+"""
+Classify a directory or manifest of leaf images without the Streamlit UI.
+
+    python diagnose_batch.py IMAGES... [--manifest list.txt]
+        [--out diagnosis.csv | diagnosis.jsonl] [--top-k 3] [--batch-size 64]
+        [--threads 0] [--save-user USERNAME] [--region REGION]
+
+IMAGES may be files or directories (searched recursively for jpg, jpeg,
+png, bmp and gif). A manifest is a text file with one path per line;
+relative paths are resolved against the manifest's directory.
+
+Files are read, decoded and resized by a tf.data pipeline running on all
+cores, with prefetching so the next batch is decoded while the current
+one is in the model. Preprocessing matches preprocess.prepare(): bilinear
+resize to 224x224, RGB, float32 in [0, 1]. Unreadable images are skipped
+and reported at the end.
+
+The output format follows the --out extension (.csv or .jsonl). With
+--save-user the top-1 class of every image is added to that user's
+prediction history in one commit.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif"}
+BATCH_SIZE = 64
+TOP_K = 3
+
+
+def collect_paths(inputs, manifest=None):
+    """Image paths from files, directories (recursive, sorted) and an optional manifest."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                paths.extend(os.path.join(root, f) for f in sorted(files)
+                             if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
+        else:
+            paths.append(item)
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return list(dict.fromkeys(paths))
+
+
+def make_dataset(paths, batch_size):
+    """tf.data pipeline yielding (paths, images) batches, decoded in parallel."""
+    import tensorflow as tf
+    from inference import INPUT_SHAPE
+
+    def load(path):
+        img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        img = tf.image.resize(img, INPUT_SHAPE[:2])  # bilinear, float32
+        return path, img * (1.0 / 255.0)
+
+    ds = tf.data.Dataset.from_tensor_slices(paths)
+    ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    ds = ds.apply(tf.data.experimental.ignore_errors())
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def diagnose(paths, batch_size=BATCH_SIZE, top_k=TOP_K):
+    """Yield (path, [(class, confidence), ...] best first) for every readable image."""
+    import metrics
+    import inference
+    from disease_kb import CLASS_NAMES
+    model = inference.load_model()
+    for names, images in make_dataset(paths, batch_size):
+        with metrics.timer("model_forward"):
+            probs = np.asarray(model.predict_on_batch(images))
+        metrics.inc("model_images", len(probs))
+        top = np.argsort(-probs, axis=1)[:, :top_k]
+        for name, p, idx in zip(names.numpy(), probs, top):
+            yield name.decode("utf-8"), [(CLASS_NAMES[i], float(p[i])) for i in idx]
+
+
+class CSVWriter:
+
+    def __init__(self, f, top_k):
+        self._writer = csv.writer(f)
+        header = ["path"]
+        for k in range(1, top_k + 1):
+            header += [f"class_{k}", f"confidence_{k}"]
+        self._writer.writerow(header)
+
+    def write(self, path, top):
+        row = [path]
+        for name, confidence in top:
+            row += [name, f"{confidence:.6f}"]
+        self._writer.writerow(row)
+
+
+class JSONLWriter:
+
+    def __init__(self, f, top_k):
+        self._f = f
+
+    def write(self, path, top):
+        self._f.write(json.dumps({"path": path, "top": [{"class": n, "confidence": c} for n, c in top]}) + "\n")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Classify many leaf images in batches.")
+    parser.add_argument("images", nargs="*", help="image files or directories")
+    parser.add_argument("--manifest", help="text file with one image path per line")
+    parser.add_argument("--out", default="diagnosis.csv", help="results file, .csv or .jsonl")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for TensorFlow ops (0 = all cores)")
+    parser.add_argument("--save-user", metavar="USERNAME", help="add the top-1 results to this user's history")
+    parser.add_argument("--region", help="region stored with --save-user results")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.images, args.manifest)
+    if not paths:
+        parser.error("no images given")
+    user_id = None
+    if args.save_user:
+        import user
+        user_id = user.get_user_id(args.save_user)
+        if user_id is None:
+            parser.error(f"unknown user: {args.save_user}")
+    if args.threads:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+        tf.config.threading.set_inter_op_parallelism_threads(args.threads)
+
+    writer_cls = JSONLWriter if args.out.endswith(".jsonl") else CSVWriter
+    seen = set()
+    top1 = []
+    start = time.perf_counter()
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+        writer = writer_cls(f, args.top_k)
+        for path, top in diagnose(paths, args.batch_size, args.top_k):
+            writer.write(path, top)
+            seen.add(path)
+            top1.append(top[0][0])
+    elapsed = time.perf_counter() - start
+
+    print(f"Classified {len(seen)} image(s) in {elapsed:.2f}s "
+          f"({len(seen) / elapsed if elapsed else 0:.1f} images/s) -> {args.out}")
+    skipped = [p for p in paths if p not in seen]
+    if skipped:
+        print(f"Skipped {len(skipped)} unreadable image(s):", file=sys.stderr)
+        for p in skipped:
+            print(f"  {p}", file=sys.stderr)
+    if user_id is not None:
+        import database
+        saved = database.save_predictions(user_id, top1, region=args.region)
+        print(f"Saved {saved} prediction(s) for {args.save_user}.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,209 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+
+# Everything the recognition page shows for a predicted class, compiled
+# into one artifact indexed by the model's output index:
+#   CLASS_NAMES (model order) + disease_sources.json (advisories, product
+#   links) + plant_diseases.json (symptoms, solutions, keywords)
+#   -> disease_kb.json, with the label and advisory pre-rendered for
+#      every language in lang_dict.
+# Build it with `python disease_kb.py` (needs the translation backend).
+# Without a current artifact the English knowledge base is compiled in
+# memory and other languages are translated on demand.
+SOURCES_FILE = "disease_sources.json"
+PLANT_DISEASES_FILE = "plant_diseases.json"
+KB_FILE = "disease_kb.json"
+
+# model output index -> PlantVillage class label
+CLASS_NAMES = [
+    'Apple___Apple_scab',
+    'Apple___Black_rot',
+    'Apple___Cedar_apple_rust',
+    'Apple___healthy',
+    'Blueberry___healthy',
+    'Cherry_(including_sour)___Powdery_mildew',
+    'Cherry_(including_sour)___healthy',
+    'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
+    'Corn_(maize)___Common_rust_',
+    'Corn_(maize)___Northern_Leaf_Blight',
+    'Corn_(maize)___healthy',
+    'Grape___Black_rot',
+    'Grape___Esca_(Black_Measles)',
+    'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
+    'Grape___healthy',
+    'Orange___Haunglongbing_(Citrus_greening)',
+    'Peach___Bacterial_spot',
+    'Peach___healthy',
+    'Pepper,_bell___Bacterial_spot',
+    'Pepper,_bell___healthy',
+    'Potato___Early_blight',
+    'Potato___Late_blight',
+    'Potato___healthy',
+    'Raspberry___healthy',
+    'Soybean___healthy',
+    'Squash___Powdery_mildew',
+    'Strawberry___Leaf_scorch',
+    'Strawberry___healthy',
+    'Tomato___Bacterial_spot',
+    'Tomato___Early_blight',
+    'Tomato___Late_blight',
+    'Tomato___Leaf_Mold',
+    'Tomato___Septoria_leaf_spot',
+    'Tomato___Spider_mites Two-spotted_spider_mite',
+    'Tomato___Target_Spot',
+    'Tomato___Tomato_Yellow_Leaf_Curl_Virus',
+    'Tomato___Tomato_mosaic_virus',
+    'Tomato___healthy',
+]
+
+
+def normalize(name):
+    """Match key for class names spelled differently across sources
+    ("Corn_(maize)___Common_rust_" and "Corn___Common_rust")."""
+    return re.sub(r"_?\([^)]*\)", "", name).strip("_").lower()
+
+
+def _source_files():
+    return [SOURCES_FILE, PLANT_DISEASES_FILE]
+
+
+def source_hash():
+    h = hashlib.sha256(json.dumps(CLASS_NAMES).encode("utf-8"))
+    for path in _source_files():
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def build(languages=()):
+    """
+    The knowledge base as a dict. Labels and advisories are translated into
+    `languages` with one backend call per language; a language whose call
+    fails is left out (and translated on demand at display time).
+    """
+    with open(SOURCES_FILE, "r", encoding="utf-8") as f:
+        sources = json.load(f)
+    with open(PLANT_DISEASES_FILE, "r", encoding="utf-8") as f:
+        details = {normalize(d["class"]): d for d in json.load(f)["plant_diseases"]}
+
+    entries = []
+    for name in CLASS_NAMES:
+        detail = details.get(normalize(name), {})
+        advice = sources["advisories"].get(name)
+        entries.append({
+            "class": name,
+            "label": {"en": name},
+            "advice": {"en": advice} if advice else {},
+            "products": sources["products"].get(name, []),
+            "symptoms": detail.get("symptoms", []),
+            "solutions": detail.get("solutions", []),
+            "keywords": detail.get("keywords", []),
+        })
+
+    rendered = ["en"]
+    if languages:
+        from translation import _service
+        texts = list(dict.fromkeys([e["class"] for e in entries] + [e["advice"]["en"] for e in entries if e["advice"]]))
+        for dest in languages:
+            if dest == "en":
+                continue
+            try:
+                translated = dict(zip(texts, _service.backend.translate_batch(texts, dest=dest, src="en")))
+            except Exception as e:
+                print(f"Skipping {dest}: {e}")
+                continue
+            for e in entries:
+                e["label"][dest] = translated[e["class"]]
+                if e["advice"]:
+                    e["advice"][dest] = translated[e["advice"]["en"]]
+            rendered.append(dest)
+    return {"source_hash": source_hash(), "languages": rendered, "classes": entries}
+
+
+def write(kb, path=KB_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(kb, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class KnowledgeBase:
+    """
+    The compiled artifact in memory. Reloaded only when one of its files
+    changes; an artifact built from older sources is ignored.
+    """
+
+    def __init__(self, path=KB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._classes = []
+
+    def _current_version(self):
+        version = []
+        for p in [self.path] + _source_files():
+            try:
+                version.append(os.stat(p).st_mtime_ns)
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def _refresh(self):
+        version = self._current_version()
+        if version == self._version:
+            return self._classes
+        with self._lock:
+            if version != self._version:
+                kb = None
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        kb = json.load(f)
+                    if kb.get("source_hash") != source_hash():
+                        print(f"{self.path} is out of date, rebuild it with `python disease_kb.py`")
+                        kb = None
+                self._classes = (kb or build())["classes"]
+                self._version = version
+        return self._classes
+
+    def entry(self, index):
+        """Everything known about the class at model output `index`, or None."""
+        classes = self._refresh()
+        return classes[index] if 0 <= index < len(classes) else None
+
+    def __len__(self):
+        return len(self._refresh())
+
+
+def localized(texts, lang):
+    """Pick `lang` from a {lang: text} dict, translating the English text if it was not pre-rendered."""
+    if lang in texts:
+        return texts[lang]
+    if "en" not in texts:
+        return None
+    from translation import tr
+    return tr(texts["en"], lang)
+
+
+_kb = None
+_kb_lock = threading.Lock()
+
+
+def get_kb():
+    """Process-wide KnowledgeBase (survives Streamlit reruns)."""
+    global _kb
+    with _kb_lock:
+        if _kb is None:
+            _kb = KnowledgeBase()
+        return _kb
+
+
+if __name__ == "__main__":
+    # Offline step: python disease_kb.py [lang ...]  -> writes disease_kb.json
+    from translation import lang_dict
+    kb = build(sys.argv[1:] or list(lang_dict.values()))
+    write(kb)
+    print(f"Wrote {KB_FILE}: {len(kb['classes'])} classes, languages {', '.join(kb['languages'])}")
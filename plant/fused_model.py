@@ -0,0 +1,59 @@
+"""
+The CNN with its preprocessing folded into the graph: it takes raw uint8
+images of any size and does the resize to 224x224, the BGR -> RGB swap
+and the scaling to [0, 1] itself, so the host never builds float32 copies
+of the image.
+
+    python fused_model.py export [--model CNN_plant_disease_model.keras]
+        [--out CNN_plant_disease_model_uint8]
+
+`export` writes a SavedModel with two signatures taking uint8
+(n, h, w, 3) batches: serving_default for BGR input (what cv2 decodes)
+and serve_rgb for RGB input.
+"""
+import sys
+import argparse
+
+INPUT_SIZE = (224, 224)
+
+
+def build(model, channel_order="bgr"):
+    """tf.function mapping uint8 (n, h, w, 3) images, any h and w, to class probabilities."""
+    import tensorflow as tf
+    if channel_order not in ("bgr", "rgb"):
+        raise ValueError(f"Unknown channel order: {channel_order}")
+
+    @tf.function(input_signature=[tf.TensorSpec([None, None, None, 3], tf.uint8)])
+    def serve(images):
+        x = tf.image.resize(images, INPUT_SIZE)  # bilinear, float32
+        if channel_order == "bgr":
+            x = tf.reverse(x, axis=[-1])
+        return model(x * (1.0 / 255.0), training=False)
+
+    return serve
+
+
+def export(keras_path, out_dir):
+    import tensorflow as tf
+    module = tf.Module()
+    module.model = tf.keras.models.load_model(keras_path)
+    module.serve_bgr = build(module.model, "bgr")
+    module.serve_rgb = build(module.model, "rgb")
+    tf.saved_model.save(module, out_dir, signatures={
+        "serving_default": module.serve_bgr,
+        "serve_rgb": module.serve_rgb,
+    })
+    return out_dir
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export the CNN with in-graph preprocessing.")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--model", default="CNN_plant_disease_model.keras")
+    parser.add_argument("--out", default="CNN_plant_disease_model_uint8")
+    args = parser.parse_args(argv)
+    print(f"SavedModel written to {export(args.model, args.out)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
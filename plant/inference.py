@@ -0,0 +1,170 @@
+import os
+import threading
+
+import numpy as np
+
+import metrics
+import preprocess
+import tflite_engine
+from batching import BatchScheduler, MAX_BATCH_SIZE, MAX_WAIT_MS
+from prediction_cache import PredictionCache
+
+# One model instance per process. Streamlit re-executes app.py on every
+# interaction, but imported modules stay in sys.modules, so the model lives
+# here instead of at the top of the script.
+MODEL_PATH = "CNN_plant_disease_model.keras"
+INPUT_SHAPE = (224, 224, 3)
+# "keras", or a TFLite variant made by `python tflite_engine.py export`:
+# "tflite-int8" (dynamic-range quantized) or "tflite-fp16"
+ENGINE = os.environ.get("AGROBOT_ENGINE", "keras")
+ENGINES = ["keras", "tflite-int8", "tflite-fp16"]
+
+_model = None
+_fused = None
+_scheduler = None
+_raw_scheduler = None
+_lock = threading.Lock()
+
+
+def model_file(engine=ENGINE, path=MODEL_PATH):
+    """File the given engine loads."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine: {engine}")
+    if engine == "keras":
+        return path
+    return tflite_engine.variant_path(path, engine.split("-", 1)[1])
+
+
+# results keyed by image hash, invalidated when the model file changes
+cache = PredictionCache(model_file())
+
+
+def load_model(path=None):
+    """
+    Load the model for ENGINE once and run a warm-up predict on a dummy
+    batch so the first real prediction does not pay the graph tracing cost.
+    Raises FileNotFoundError if the model file is missing.
+    """
+    global _model
+    if _model is not None:
+        return _model
+    path = path or model_file()
+    with _lock:
+        if _model is None:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Model file not found: {path}")
+            if ENGINE == "keras":
+                import tensorflow as tf  # deferred: only inference pays for it
+                model = tf.keras.models.load_model(path)
+            else:
+                model = tflite_engine.TFLiteModel(path)
+            model.predict(np.zeros((1,) + INPUT_SHAPE, dtype="float32"), verbose=0)
+            _model = model
+            print(f"Model loaded successfully from {path}")
+    return _model
+
+
+def predict(images):
+    """
+    Run the CNN on a batch of preprocessed images, shape (n, 224, 224, 3),
+    float32 in [0, 1]. Returns the class probabilities, shape (n, classes).
+    """
+    images = np.asarray(images, dtype="float32")
+    if images.ndim == 3:
+        images = images[np.newaxis]
+    model = load_model()
+    with metrics.timer("model_forward"):
+        probs = model.predict(images, verbose=0)
+    metrics.inc("model_images", len(images))
+    return probs
+
+
+def _get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _lock:
+            if _scheduler is None:
+                _scheduler = BatchScheduler(predict)
+    return _scheduler
+
+
+def predict_one(image):
+    """
+    Predict a single preprocessed (224, 224, 3) image through the shared
+    micro-batching queue, so concurrent sessions share forward passes.
+    Returns that image's class probabilities.
+    """
+    return _get_scheduler().predict(image)
+
+
+def _get_fused():
+    global _fused
+    if _fused is None:
+        model = load_model()
+        with _lock:
+            if _fused is None:
+                if ENGINE == "keras":
+                    import fused_model
+                    _fused = fused_model.build(model, "bgr")
+                else:
+                    # the TFLite variants take float input, so preprocess on the host
+                    _fused = lambda images: model.predict(np.stack([preprocess.prepare(img) for img in images]))
+    return _fused
+
+
+def predict_raw(images):
+    """
+    Run the CNN on BGR uint8 images as cv2 decodes them, shape (n, h, w, 3)
+    or a single (h, w, 3), any h and w. Resize, BGR -> RGB and scaling run
+    inside the model graph. Returns the class probabilities.
+    """
+    images = np.asarray(images, dtype=np.uint8)
+    if images.ndim == 3:
+        images = images[np.newaxis]
+    fn = _get_fused()
+    with metrics.timer("model_forward"):
+        probs = np.asarray(fn(images))
+    metrics.inc("model_images", len(images))
+    return probs
+
+
+def raw_scheduler(max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+    """
+    The shared micro-batching queue in front of predict_raw(). The limits
+    apply when it is created, on the first call in the process.
+    """
+    global _raw_scheduler
+    if _raw_scheduler is None:
+        with _lock:
+            if _raw_scheduler is None:
+                _raw_scheduler = BatchScheduler(
+                    predict_raw, max_batch_size, max_wait_ms,
+                    collate=preprocess.BatchBuffer(max_batch_size).fill, dtype=None)
+    return _raw_scheduler
+
+
+def predict_one_raw(image):
+    """
+    Predict one decoded BGR uint8 image of any size through the shared
+    micro-batching queue. Every image, batched or alone, is resized on
+    the host (cv2, bilinear) into a preallocated uint8 buffer that is
+    reused for every batch, so its model input does not depend on what
+    it was batched with.
+    """
+    return raw_scheduler().predict(image)
+
+
+def batch_metrics():
+    """Queue depth and batch-size metrics of the shared scheduler."""
+    return _get_scheduler().metrics()
+
+
+def _gauges():
+    gauges = {f"prediction_cache_{k}": v for k, v in cache.stats().items() if isinstance(v, (int, float))}
+    for prefix, scheduler in [("batch_", _scheduler), ("raw_batch_", _raw_scheduler)]:
+        if scheduler is not None:
+            gauges.update({prefix + k: v for k, v in scheduler.metrics().items() if isinstance(v, (int, float))})
+    return gauges
+
+
+metrics.add_collector(_gauges)
@@ -0,0 +1,121 @@
+import os
+import json
+import queue
+import threading
+import http.client
+from urllib.parse import urlsplit, urlencode
+
+# Client for inference_service.py. With AGROBOT_INFERENCE_URL set (e.g.
+# http://127.0.0.1:8601) the app sends uploads to the service instead of
+# loading the model itself. Connections are kept alive and reused from a
+# pool, so a prediction does not pay for a new TCP connection.
+SERVICE_URL = os.environ.get("AGROBOT_INFERENCE_URL")
+POOL_SIZE = 8
+TIMEOUT = 60
+# how a kept-alive connection the server has closed fails; anything else
+# (a timeout in particular) is not retried
+_STALE_CONNECTION = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class ServiceError(Exception):
+    """The service answered with an error, or could not be reached."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class InferenceClient:
+    """
+    Thread-safe client with a pool of keep-alive HTTP connections. At most
+    pool_size idle connections are kept; busier callers open extra ones
+    that are closed after use.
+    """
+
+    def __init__(self, url=SERVICE_URL, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        if not url:
+            raise ValueError("No inference service URL given")
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError(f"Unsupported inference service URL: {url}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(self, method, path, body=None, headers=None):
+        retried = False
+        while True:
+            conn, reused = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if reused and not retried and isinstance(e, _STALE_CONNECTION):
+                    # the server closed an idle connection, retry once on a fresh one
+                    retried = True
+                    continue
+                raise ServiceError(f"Inference service unreachable at {self.url}: {e}") from e
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            try:
+                payload = json.loads(data)
+            except ValueError:
+                payload = {"error": data.decode("utf-8", "replace")}
+            return resp.status, payload
+
+    def predict(self, image_bytes, lang="en", top_k=3):
+        """
+        Classify one encoded image (bytes or a memoryview). Returns the
+        service's answer: index, class, confidence, top, label, advice,
+        products and probabilities.
+        """
+        path = "/predict?" + urlencode({"lang": lang, "top_k": top_k})
+        status, payload = self._request("POST", path, body=image_bytes, headers={
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(memoryview(image_bytes).nbytes),
+        })
+        if status != 200:
+            raise ServiceError(payload.get("error", f"HTTP {status}"), status)
+        return payload
+
+    def health(self):
+        """The /health answer; "status" is "ok" once the model is loaded."""
+        return self._request("GET", "/health")[1]
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client for AGROBOT_INFERENCE_URL (survives Streamlit reruns)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient()
+    return _client
@@ -0,0 +1,281 @@
+"""
+Disease recognition as a local HTTP service, so every app process (and
+any other tool) shares one loaded model instead of loading its own.
+
+    python inference_service.py [--host 127.0.0.1] [--port 8601]
+        [--workers 4] [--max-batch 16] [--max-wait-ms 10]
+
+    POST /predict?lang=hi&top_k=3   body: the encoded image (jpg, png, ...)
+        -> {"index", "class", "confidence", "top": [{"class", "confidence"}],
+            "label", "advice", "products", "probabilities"}
+    GET  /health
+        -> 200 {"status": "ok", ...}, or 503 {"status": "loading", ...}
+           until the model is ready
+
+The main process opens the listening socket and starts --workers HTTP
+worker processes that all accept on it, then loads the model (ENGINE, see
+inference.py). Workers read and decode uploads and look the class up in
+the disease knowledge base; the decoded images, resized to the 224x224
+uint8 model input, go to the main process over a queue, where the BatchScheduler batches requests from all
+workers into shared forward passes. The model is in memory once. Workers
+are started before the model loads, and with the spawn method, because
+tensorflow's thread pools do not survive a fork.
+
+A worker that dies is restarted. inference_client.py is the client.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from batching import MAX_BATCH_SIZE, MAX_WAIT_MS
+
+DEFAULT_PORT = 8601
+WORKERS = min(4, os.cpu_count() or 1)
+TOP_K = 3
+MAX_BODY_BYTES = 50 * 1024 * 1024
+PREDICT_TIMEOUT = 60  # seconds a worker waits for the model process
+
+
+# ---------- worker processes ----------
+
+class _ModelChannel:
+    """
+    Worker side of the queue to the model process: sends (worker, request
+    id, image) and matches the answers coming back on this worker's own
+    queue to the waiting request threads. Request ids carry the worker's
+    pid, so a restarted worker never takes an answer meant for its
+    predecessor; answers nobody waits for are dropped.
+    """
+
+    def __init__(self, worker_id, requests, responses):
+        self._worker_id = worker_id
+        self._requests = requests
+        self._responses = responses
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._receive, name="model-responses", daemon=True).start()
+
+    def predict(self, image, timeout=PREDICT_TIMEOUT):
+        future = Future()
+        with self._lock:
+            request_id = (os.getpid(), next(self._ids))
+            self._pending[request_id] = future
+        try:
+            self._requests.put((self._worker_id, request_id, image))
+            return future.result(timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def _receive(self):
+        while True:
+            request_id, probs, error = self._responses.get()
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:  # timed out, or sent by a previous worker
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(probs)
+
+
+def describe(probs, lang="en", top_k=TOP_K):
+    """The JSON answer for one image's class probabilities."""
+    import numpy as np
+    from disease_kb import CLASS_NAMES, get_kb, localized
+    probs = np.asarray(probs, dtype=np.float32)
+    top = np.argsort(-probs)[:max(top_k, 1)]
+    index = int(top[0])
+    entry = get_kb().entry(index) or {}
+    return {
+        "index": index,
+        "class": CLASS_NAMES[index],
+        "confidence": float(probs[index]),
+        "top": [{"class": CLASS_NAMES[i], "confidence": float(probs[i])} for i in top],
+        "label": localized(entry["label"], lang) if entry else CLASS_NAMES[index],
+        "advice": localized(entry["advice"], lang) if entry.get("advice") else None,
+        "products": entry.get("products", []),
+        "probabilities": [float(p) for p in probs],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, so the client can reuse its pooled connections
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        ready = self.server.model_ready.is_set()
+        self._send_json(200 if ready else 503, {
+            "status": "ok" if ready else "loading",
+            "worker": os.getpid(),
+            "workers": self.server.workers,
+        })
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self._send_json(411, {"error": "Content-Length required"})
+            return
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": f"image larger than {MAX_BODY_BYTES} bytes"})
+            return
+        data = self.rfile.read(length)
+        if not self.server.model_ready.is_set():
+            self._send_json(503, {"error": "model is loading"})
+            return
+
+        query = parse_qs(url.query)
+        lang = query.get("lang", ["en"])[0]
+        try:
+            top_k = int(query.get("top_k", [TOP_K])[0])
+        except ValueError:
+            self._send_json(400, {"error": "top_k must be an integer"})
+            return
+
+        import preprocess
+        img = preprocess.decode_image(data) if data else None
+        if img is None:
+            self._send_json(400, {"error": "could not decode image"})
+            return
+        try:
+            # only the 224x224 input crosses the process boundary
+            probs = self.server.channel.predict(preprocess.resize(img))
+        except Exception as e:
+            self._send_json(500, {"error": f"prediction failed: {e}"})
+            return
+        self._send_json(200, describe(probs, lang, top_k))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(sock, worker_id, workers, requests, responses, model_ready):
+    """Worker process: serve HTTP on the shared listening socket."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the main process shuts workers down
+    server = ThreadingHTTPServer(sock.getsockname()[:2], _Handler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.daemon_threads = True
+    server.workers = workers
+    server.model_ready = model_ready
+    server.channel = _ModelChannel(worker_id, requests, responses)
+    server.serve_forever()
+
+
+# ---------- model process ----------
+
+def _reply(responses, request_id, future):
+    error = future.exception()
+    if error is not None:
+        responses.put((request_id, None, f"{type(error).__name__}: {error}"))
+    else:
+        responses.put((request_id, future.result(), None))
+
+
+def _dispatch(requests, responses, scheduler):
+    """Feed images from every worker into the batch scheduler, answer on the sender's queue."""
+    while True:
+        worker_id, request_id, image = requests.get()
+        scheduler.submit(image).add_done_callback(partial(_reply, responses[worker_id], request_id))
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=WORKERS,
+          max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+    """Run the service until interrupted (Ctrl-C or SIGTERM)."""
+    ctx = mp.get_context("spawn")
+    sock = socket.create_server((host, port), backlog=128)
+    requests = ctx.Queue()
+    responses = [None] * workers
+    model_ready = ctx.Event()
+
+    def start_worker(i):
+        # a fresh answer queue: one left over from a dead worker may still
+        # receive answers to its requests
+        responses[i] = ctx.Queue()
+        p = ctx.Process(target=_serve, name=f"inference-worker-{i}", daemon=True,
+                        args=(sock, i, workers, requests, responses[i], model_ready))
+        p.start()
+        return p
+
+    procs = [start_worker(i) for i in range(workers)]
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        import numpy as np
+        import inference
+        inference.load_model()
+        scheduler = inference.raw_scheduler(max_batch_size, max_wait_ms)
+        inference.predict_raw(np.zeros((1,) + inference.INPUT_SHAPE, dtype=np.uint8))  # trace the uint8 graph
+        threading.Thread(target=_dispatch, args=(requests, responses, scheduler),
+                         name="model-dispatch", daemon=True).start()
+        model_ready.set()
+        print(f"Inference service ({inference.ENGINE}) on http://{host}:{sock.getsockname()[1]} "
+              f"with {workers} worker(s)")
+
+        while True:
+            time.sleep(1)
+            for i, p in enumerate(procs):
+                if not p.is_alive():
+                    print(f"Worker {i} exited with code {p.exitcode}, restarting")
+                    procs[i] = start_worker(i)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join(5)
+        sock.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Serve disease recognition over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="HTTP worker processes")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE, help="largest batch per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="how long a batch waits to fill")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    serve(args.host, args.port, args.workers, args.max_batch, args.max_wait_ms)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,142 @@
+import os
+import json
+import random
+import threading
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Multi-keyword substring matcher. Build once from (keyword, value) pairs,
+    then find every keyword occurring in a text in one pass over the text.
+    Matching is case-insensitive.
+    """
+
+    def __init__(self, pairs):
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = [[]]   # values of the keywords ending exactly at this node
+        self._link = [0]   # nearest proper suffix node that ends a keyword
+        for keyword, value in pairs:
+            self._add(keyword.lower(), value)
+        self._build()
+
+    def _add(self, keyword, value):
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+                self._link.append(0)
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._own[node].append(value)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                if fail == nxt:
+                    fail = 0
+                self._fail[nxt] = fail
+                self._link[nxt] = fail if self._own[fail] else self._link[fail]
+
+    def find_all(self, text):
+        """
+        Values of every keyword that occurs in `text`, once per keyword
+        (the same as testing `keyword in text` for each keyword), in order
+        of first occurrence.
+        """
+        goto, fail, own, link = self._goto, self._fail, self._own, self._link
+        seen = set()
+        found = []
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if own[node] else link[node]
+            # a node already seen had its whole suffix chain reported then
+            while hit and hit not in seen:
+                seen.add(hit)
+                found.extend(own[hit])
+                hit = link[hit]
+        return found
+
+
+class DiseaseKnowledgeBase:
+    """
+    plant_diseases.json compiled into a keyword automaton. The file is
+    re-read only when its mtime changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._compiled = ([], AhoCorasick([]))  # (diseases, matcher), swapped as one
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            diseases = []
+            if mtime is not None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    diseases = json.load(f)["plant_diseases"]
+            matcher = AhoCorasick(
+                (keyword, i) for i, d in enumerate(diseases) for keyword in d["keywords"]
+            )
+            self._compiled = (diseases, matcher)
+            self._mtime = mtime
+
+    def match(self, text):
+        """Diseases whose keywords occur in `text`, once per matching keyword."""
+        self._refresh()
+        diseases, matcher = self._compiled
+        return [diseases[i] for i in matcher.find_all(text)]
+
+    def respond(self, text):
+        """English response text for one randomly chosen match, or None."""
+        matches = self.match(text)
+        if not matches:
+            return None
+        return format_disease(random.choice(matches))
+
+
+_knowledge_bases = {}
+_kb_lock = threading.Lock()
+
+
+def get_knowledge_base(path):
+    """Process-wide DiseaseKnowledgeBase for `path` (survives Streamlit reruns)."""
+    with _kb_lock:
+        kb = _knowledge_bases.get(path)
+        if kb is None:
+            kb = _knowledge_bases[path] = DiseaseKnowledgeBase(path)
+        return kb
+
+
+def format_disease(disease):
+    return (
+        f"Disease: {disease['class']}\n"
+        f"Symptoms: {', '.join(disease['symptoms'])}\n"
+        f"Solutions: {', '.join(disease['solutions'])}"
+    )
@@ -0,0 +1,676 @@
+import os
+import json
+import time
+import atexit
+import itertools
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Write-behind settings: appends are buffered and written in one group
+# commit once FLUSH_MAX_PENDING records are waiting or the oldest one has
+# waited FLUSH_INTERVAL seconds.
+FLUSH_MAX_PENDING = 64
+FLUSH_INTERVAL = 0.05
+
+_ANY = object()
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive OS lock on the file at `path` (created if missing), held for the block."""
+    with open(path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _StaleIndex(Exception):
+    """A line read via the offset index is not the record the index expects."""
+
+
+class AppendLog:
+    """
+    Append-only JSON Lines store.
+    Every line is either a record {"id": n, "rec": {...}} or a tombstone
+    {"id": n, "del": 1}. Writes are a single append; reads replay the log.
+    Tombstones are folded away by compact(), which runs in the background
+    once they make up a large share of the file.
+
+    An in-memory index maps record ids and the value of `index_key`
+    (user_id by default) to byte offsets in the file, so one user's records
+    can be read back without replaying the whole log. The index is kept up
+    to date by our own writes. Lines other processes append are indexed by
+    reading just the new bytes; the index is rebuilt from scratch only when
+    the file is replaced (compaction, rewrite) or shrinks.
+
+    append() only queues the record. A flusher thread group-commits the
+    queue (one write + fsync) under an exclusive lock on `<path>.lock`, so
+    several threads and processes can write to the same log without losing
+    records. Ids are assigned at commit time, under that lock. Reads flush
+    this process's queue first.
+    """
+
+    def __init__(self, path, legacy_path=None, index_key="user_id",
+                 compact_min=64, compact_ratio=0.5,
+                 flush_max_pending=FLUSH_MAX_PENDING, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.index_key = index_key
+        self.compact_min = compact_min
+        self.compact_ratio = compact_ratio
+        self.flush_max_pending = flush_max_pending
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._flock_depth = 0
+        self._next_id = 1
+        self._tombstones = 0
+        self._compacting = False
+        self._needs_newline = False
+        # index state: (inode, bytes indexed) of the file, None = rebuild
+        self._stat = None
+        self._offsets = {}   # id -> byte offset
+        self._keys = {}      # id -> index key value
+        self._by_key = {}    # index key value -> {id: byte offset}
+        # write-behind queue
+        self._cond = threading.Condition()
+        self._pending = []
+        self._first_pending = 0.0
+        self._flusher = None
+        atexit.register(self.flush)
+
+    # ---------- locking ----------
+
+    @contextmanager
+    def _locked(self):
+        """Thread lock plus an exclusive OS lock on <path>.lock (re-entrant)."""
+        with self._lock:
+            if self._flock_depth:
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                return
+            with file_lock(self.path + ".lock"):
+                self._flock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth = 0
+
+    # ---------- reading ----------
+
+    def _import_legacy(self):
+        """Convert an old JSON array file into the log format (first run only)."""
+        if os.path.exists(self.path) or not self.legacy_path:
+            return
+        if not os.path.exists(self.legacy_path) or os.stat(self.legacy_path).st_size == 0:
+            return
+        with self._locked():
+            if os.path.exists(self.path):
+                return
+            try:
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    old = json.load(f)
+            except json.JSONDecodeError:
+                return
+            if isinstance(old, list):
+                self._write_all(list(enumerate(old, start=1)))
+
+    def _index_add(self, rid, offset, rec):
+        key = rec.get(self.index_key) if isinstance(rec, dict) else None
+        self._offsets[rid] = offset
+        self._keys[rid] = key
+        self._by_key.setdefault(key, {})[rid] = offset
+
+    def _index_remove(self, rid):
+        if rid not in self._offsets:
+            return
+        del self._offsets[rid]
+        key = self._keys.pop(rid)
+        bucket = self._by_key.get(key)
+        if bucket is not None:
+            bucket.pop(rid, None)
+            if not bucket:
+                del self._by_key[key]
+
+    def _replay(self, f, offset, live=None):
+        """
+        Index the lines of `f` from byte `offset` on (and fold them into
+        `live`, an {id: record} dict, if given). Returns the offset after
+        the last line read; an unfinished last line is left for next time.
+        """
+        f.seek(offset)
+        max_id = 0
+        for raw in f:
+            start = offset
+            complete = raw.endswith(b"\n")
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                if not complete:
+                    # a write in progress, or torn by a crash
+                    self._needs_newline = True
+                    break
+                entry = None
+            offset += len(raw)
+            self._needs_newline = not complete
+            rid = entry.get("id") if isinstance(entry, dict) else None
+            if rid is None:
+                continue
+            max_id = max(max_id, rid)
+            if entry.get("del"):
+                self._tombstones += 1
+                if live is not None:
+                    live.pop(rid, None)
+                self._index_remove(rid)
+            else:
+                rec = entry.get("rec")
+                if live is not None:
+                    live[rid] = rec
+                self._index_remove(rid)
+                self._index_add(rid, start, rec)
+        self._next_id = max(self._next_id, max_id + 1)
+        return offset
+
+    def _reset_index(self):
+        self._offsets, self._keys, self._by_key = {}, {}, {}
+        self._tombstones = 0
+        self._needs_newline = False
+        self._stat = None
+
+    def _rebuild(self, f, live=None):
+        """Index the open log file `f` from its first line."""
+        self._reset_index()
+        inode = os.fstat(f.fileno()).st_ino
+        self._stat = (inode, self._replay(f, 0, live))
+
+    def _scan(self):
+        """Replay the whole log, rebuild the index and return {id: record}."""
+        self._import_legacy()
+        live = {}
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._reset_index()
+            return live
+        with f:
+            self._rebuild(f, live)
+        return live
+
+    def _catch_up(self):
+        """
+        Index what was appended since the last look, reading only the new
+        bytes. Returns False if that is not enough: never indexed, or the
+        file was replaced or shrank since.
+        """
+        if self._stat is None:
+            return False
+        inode, indexed = self._stat
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if st.st_ino != inode or st.st_size < indexed:
+            return False
+        if st.st_size > indexed:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_ino != inode:
+                    return False
+                self._stat = (inode, self._replay(f, indexed))
+        return True
+
+    def _ensure_index(self):
+        if not self._catch_up():
+            self._scan()
+
+    @contextmanager
+    def _indexed_file(self):
+        """
+        Open the log and bring the index up to date from that open file,
+        so offsets are only ever used on the file they were taken from:
+        another process may replace the log (compaction, rewrite) at any
+        time. Yields None if there is no log yet. Call under self._lock.
+        """
+        self._import_legacy()
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._reset_index()
+            yield None
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if self._stat is None or self._stat[0] != st.st_ino or st.st_size < self._stat[1]:
+                self._rebuild(f)
+            elif st.st_size > self._stat[1]:
+                self._stat = (st.st_ino, self._replay(f, self._stat[1]))
+            yield f
+
+    def _read_indexed(self, read):
+        """
+        Return read(f) for the log file opened by _indexed_file(). If a
+        line is not the record the index says it is (the file was changed
+        in place), the index is rebuilt and read() runs once more.
+        """
+        for attempt in range(2):
+            with self._indexed_file() as f:
+                try:
+                    return read(f)
+                except _StaleIndex:
+                    if attempt:
+                        raise
+                    self._stat = None
+
+    @staticmethod
+    def _read_record(f, rid, offset):
+        """The record with id `rid`, from its line at byte `offset` of `f`."""
+        f.seek(offset)
+        try:
+            entry = json.loads(f.readline())
+        except ValueError:
+            entry = None
+        if not isinstance(entry, dict) or entry.get("id") != rid or "rec" not in entry:
+            raise _StaleIndex(f"no record {rid} at byte {offset}")
+        return entry["rec"]
+
+    def _read_tail(self, chunk=64 * 1024):
+        """
+        (largest id, whether the file lacks a final newline), from the end
+        of the file. Record ids only grow along the file, so the last
+        chunk that holds a record line is enough.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return 0, False
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return 0, False
+            f.seek(end - 1)
+            needs_newline = f.read(1) != b"\n"
+            size = chunk
+            while True:
+                start = max(0, end - size)
+                f.seek(start)
+                lines = f.read(end - start).split(b"\n")
+                if start > 0:
+                    lines = lines[1:]  # probably cut in the middle
+                max_id, has_record = 0, False
+                for raw in lines:
+                    try:
+                        entry = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and isinstance(entry.get("id"), int):
+                        max_id = max(max_id, entry["id"])
+                        has_record = has_record or not entry.get("del")
+                if has_record or start == 0:
+                    return max_id, needs_newline
+                size *= 2
+
+    def entries(self):
+        """Replay the log and return the live records as [(id, record), ...] in insert order."""
+        self.flush()
+        with self._lock:
+            return list(self._scan().items())
+
+    def records(self):
+        return [rec for _, rec in self.entries()]
+
+    def ids_for(self, key):
+        """Ids of the live records whose index key equals `key`, in insert order."""
+        self.flush()
+        with self._lock:
+            self._ensure_index()
+            return list(self._by_key.get(key, ()))
+
+    def find(self, key):
+        """
+        Return [(id, record), ...] for records whose index key equals `key`.
+        Only that key's lines are read, via the offset index.
+        """
+        def read(f):
+            offsets = self._by_key.get(key, {})
+            return [(rid, self._read_record(f, rid, offset)) for rid, offset in offsets.items()]
+
+        self.flush()
+        with self._lock:
+            return self._read_indexed(read)
+
+    def newest(self, limit, key=_ANY, before=None):
+        """
+        Up to `limit` live records, newest first, with ids below `before`
+        (a cursor: pass the last id of the previous page to load older ones).
+        The offset index is walked from its newest end and only the returned
+        lines are read, so the cost does not grow with the size of the log.
+        """
+        def read(f):
+            candidates = self._offsets if key is _ANY else self._by_key.get(key)
+            if not candidates:
+                return []
+            chosen = reversed(candidates.items())
+            if before is not None:
+                chosen = itertools.dropwhile(lambda item: item[0] >= before, chosen)
+            return [(rid, self._read_record(f, rid, pos))
+                    for rid, pos in itertools.islice(chosen, limit)]
+
+        self.flush()
+        with self._lock:
+            return self._read_indexed(read)
+
+    def page(self, offset, limit, key=_ANY, predicate=None):
+        """
+        One page of live records, in insert order, plus the total number of
+        matches: ([(id, record), ...], total).
+        key restricts the page to one index key (via the offset index);
+        predicate(record) filters further. Without a predicate only the
+        records on the page are read; with one, matching records are
+        counted in a single streaming pass and only the page is kept.
+        """
+        def read(f):
+            candidates = self._offsets if key is _ANY else self._by_key.get(key, {})
+            if not candidates:
+                return [], 0
+            if predicate is None:
+                chosen = itertools.islice(candidates.items(), offset, offset + limit)
+                return [(rid, self._read_record(f, rid, pos)) for rid, pos in chosen], len(candidates)
+            rows, total = [], 0
+            for rid, rec in self._iter_live(f, candidates):
+                if not predicate(rec):
+                    continue
+                if offset <= total < offset + limit:
+                    rows.append((rid, rec))
+                total += 1
+            return rows, total
+
+        self.flush()
+        with self._lock:
+            return self._read_indexed(read)
+
+    def _iter_live(self, f, candidates):
+        """Yield (id, record) for the given {id: offset} map of file `f`, in file order."""
+        if candidates is self._offsets:
+            # whole table: one sequential read, skipping dead lines
+            f.seek(0)
+            pos = 0
+            for raw in f:
+                start = pos
+                pos += len(raw)
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    continue
+                rid = entry.get("id") if isinstance(entry, dict) else None
+                if rid is not None and candidates.get(rid) == start:
+                    yield rid, entry["rec"]
+        else:
+            for rid, pos in candidates.items():
+                yield rid, self._read_record(f, rid, pos)
+
+    def read_since(self, offset, inode=None):
+        """
+        Complete entries (records and tombstones) written after byte
+        `offset`: (entries, new_offset, inode). If the file was replaced
+        since (rewrite/compaction, reported as a different inode) entries
+        is None: offsets no longer line up and the caller should start
+        over, e.g. with fold_live().
+        """
+        self.flush()
+        self._import_legacy()
+        entries = []
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return (entries if inode is None else None), 0, None
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != inode or offset > st.st_size:
+                return None, 0, st.st_ino
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # incomplete tail, pick it up next time
+                offset += len(raw)
+                try:
+                    entries.append(json.loads(raw))
+                except ValueError:
+                    continue
+        return entries, offset, st.st_ino
+
+    def read_at(self, offset, inode):
+        """The entry at byte `offset` of the file with `inode`, or None if that file was replaced."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            if os.fstat(f.fileno()).st_ino != inode:
+                return None
+            f.seek(offset)
+            try:
+                return json.loads(f.readline())
+            except ValueError:
+                return None
+
+    def fold_live(self, fn):
+        """
+        Call fn(id, record) for every live record, in file order, in one
+        sequential read. Returns (offset, inode) for read_since() to
+        continue from.
+        """
+        def read(f):
+            if f is None:
+                return 0, None
+            inode, offset = self._stat
+            for rid, rec in self._iter_live(f, self._offsets):
+                fn(rid, rec)
+            return offset, inode
+
+        self.flush()
+        with self._lock:
+            return self._read_indexed(read)
+
+    # ---------- writing ----------
+
+    def _sync_for_write(self):
+        """
+        Under _locked(), before ids are assigned: index what other writers
+        appended, reading only the new lines. If the file was replaced, the
+        index is dropped rather than rebuilt here (the next read rebuilds
+        it, outside the file lock) and the id counter comes from the tail
+        of the file. Returns whether the index is usable.
+        """
+        if self._catch_up():
+            return True
+        self._stat = None
+        max_id, self._needs_newline = self._read_tail()
+        self._next_id = max(self._next_id, max_id + 1)
+        return False
+
+    def _append_lines(self, entries, indexed=True):
+        """
+        Append entries in one write + fsync, keeping the index in sync if
+        it is usable (see _sync_for_write). Call under _locked().
+        """
+        lines = [(json.dumps(e, ensure_ascii=False) + "\n").encode("utf-8") for e in entries]
+        with open(self.path, "ab") as f:
+            if self._needs_newline:
+                f.write(b"\n")
+                self._needs_newline = False
+            offset = f.tell()
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+            inode = os.fstat(f.fileno()).st_ino
+        if not indexed:
+            return
+        for entry, line in zip(entries, lines):
+            if entry.get("del"):
+                self._index_remove(entry["id"])
+            else:
+                self._index_add(entry["id"], offset, entry["rec"])
+            offset += len(line)
+        self._stat = (inode, offset)
+
+    def append(self, record):
+        """Queue one record for the next group commit."""
+        with self._cond:
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._pending.append(record)
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+            if len(self._pending) >= self.flush_max_pending:
+                self._cond.notify_all()
+
+    def extend(self, records):
+        """Write many records now in one group commit (queued appends go first)."""
+        records = list(records)
+        self.flush()
+        if not records:
+            return 0
+        with self._lock:
+            self._ensure_index()  # any full rebuild happens before the file lock is taken
+            with self._locked():
+                indexed = self._sync_for_write()
+                entries = []
+                for record in records:
+                    entries.append({"id": self._next_id, "rec": record})
+                    self._next_id += 1
+                self._append_lines(entries, indexed)
+        metrics.inc("log_records_written", len(entries), log=os.path.basename(self.path))
+        return len(entries)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._first_pending + self.flush_interval
+                while self._pending and len(self._pending) < self.flush_max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+    def flush(self):
+        """Write every queued record now, in one group commit."""
+        if not self._pending:
+            return
+        with self._lock:
+            self._ensure_index()  # any full rebuild happens before the file lock is taken
+            with self._locked():
+                with self._cond:
+                    batch, self._pending = self._pending, []
+                if not batch:
+                    return
+                start = time.perf_counter()
+                indexed = self._sync_for_write()
+                entries = []
+                for record in batch:
+                    entries.append({"id": self._next_id, "rec": record})
+                    self._next_id += 1
+                self._append_lines(entries, indexed)
+        log = os.path.basename(self.path)
+        metrics.observe("log_flush", time.perf_counter() - start, log=log)
+        metrics.inc("log_records_written", len(entries), log=log)
+
+    def delete(self, ids):
+        """Write tombstones for the given record ids."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        self.flush()
+        with self._lock:
+            self._ensure_index()  # any full rebuild happens before the file lock is taken
+            with self._locked():
+                indexed = self._sync_for_write()
+                if indexed:
+                    ids = [rid for rid in dict.fromkeys(ids) if rid in self._offsets]
+                else:
+                    # file replaced under us: ids survive compaction, so
+                    # tombstone them all; unknown ones are ignored on replay
+                    ids = list(dict.fromkeys(ids))
+                if not ids:
+                    return 0
+                # "at" points readers of the tail (analytics rollups) at the deleted line
+                self._append_lines([{"id": rid, "del": 1, "at": self._offsets[rid]} if indexed
+                                    else {"id": rid, "del": 1} for rid in ids], indexed)
+                self._tombstones += len(ids)
+        self._maybe_compact()
+        return len(ids)
+
+    def _write_all(self, entries, last_id=0):
+        """
+        Replace the file with the given (id, record) entries. If last_id is
+        above every entry's id, a tombstone for it is written last, so ids
+        keep increasing after the file is replaced (ids are never reused).
+        """
+        tmp_path = self.path + ".tmp"
+        top = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for rid, rec in entries:
+                f.write(json.dumps({"id": rid, "rec": rec}, ensure_ascii=False) + "\n")
+                top = max(top, rid)
+            if last_id > top:
+                f.write(json.dumps({"id": last_id, "del": 1}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._stat = None
+
+    def rewrite(self, records):
+        """
+        Replace the whole store with the given records. Queued appends are
+        committed first, and the records get new ids above every id used
+        so far, so an id a caller still holds never names another record.
+        """
+        with self._locked():
+            self.flush()
+            self._ensure_index()
+            first = self._next_id
+            self._next_id = first + len(records)
+            self._write_all(list(enumerate(records, start=first)), last_id=self._next_id - 1)
+            self._scan()
+
+    # ---------- compaction ----------
+
+    def compact(self):
+        """Rewrite the log with only live records, dropping tombstones."""
+        self.flush()
+        with self._locked(), metrics.timer("log_compact", log=os.path.basename(self.path)):
+            live = self._scan()
+            self._write_all(live.items(), last_id=self._next_id - 1)
+            self._scan()
+            self._compacting = False
+
+    def _maybe_compact(self):
+        with self._lock:
+            if self._compacting or self._tombstones < self.compact_min:
+                return
+            if self._tombstones < self.compact_ratio * (self._next_id - 1):
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-process counters and latency histograms for the recognition and chat
+# flows and the storage layer. Recording is a bisect and a few integer
+# adds under a per-series lock, cheap enough to stay on in production.
+#
+#   AGROBOT_METRICS=0            turn recording off
+#   AGROBOT_METRICS_PORT=9108    serve /metrics (Prometheus text) and
+#                                /metrics.json on 127.0.0.1
+#   AGROBOT_METRICS_LOG=path     also write every timing as a JSON line
+ENABLED = os.environ.get("AGROBOT_METRICS", "1") != "0"
+METRICS_PORT = os.environ.get("AGROBOT_METRICS_PORT")
+METRICS_LOG = os.environ.get("AGROBOT_METRICS_LOG")
+PREFIX = "agrobot_"
+
+# seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty or +Inf)."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, sum_ = list(self.counts), self.count, self.sum
+        return {"count": total, "sum": sum_,
+                "mean": sum_ / total if total else None,
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99),
+                "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts))}
+
+
+class Registry:
+    """Counters and histograms keyed by (name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def add_collector(self, fn):
+        """fn() -> {name: number}, read at export time (queue depths, cache sizes)."""
+        self._collectors.append(fn)
+
+    def _gauges(self):
+        gauges = {}
+        for fn in self._collectors:
+            try:
+                gauges.update(fn())
+            except Exception as e:  # a broken collector must not break the endpoint
+                logger.warning("metrics collector failed: %s", e)
+        return gauges
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "counters": [dict(name=n, labels=dict(l), value=v) for (n, l), v in sorted(counters.items())],
+            "histograms": [dict(name=n, labels=dict(l), **h.snapshot()) for (n, l), h in sorted(histograms.items())],
+            "gauges": self._gauges(),
+        }
+
+    def prometheus(self):
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        for (name, labels), value in counters:
+            declare(f"{name}_total", "counter")
+            lines.append(f"{PREFIX}{name}_total{_labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            with hist._lock:
+                counts, total, sum_ = list(hist.counts), hist.count, hist.sum
+            declare(f"{name}_seconds", "histogram")
+            cumulative = 0
+            for bound, n in zip(list(hist.buckets) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_seconds_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_seconds_sum{_labels(labels)} {sum_}")
+            lines.append(f"{PREFIX}{name}_seconds_count{_labels(labels)} {total}")
+        for name, value in sorted(self._gauges().items()):
+            declare(name, "gauge")
+            lines.append(f"{PREFIX}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+logger = logging.getLogger("agrobot.metrics")
+_log_enabled = False
+if METRICS_LOG:
+    _handler = logging.FileHandler(METRICS_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _log_enabled = True
+
+
+def observe(name, seconds, **labels):
+    """Record one duration for histogram `name`."""
+    if not ENABLED:
+        return
+    registry.histogram(name, **labels).observe(seconds)
+    if _log_enabled:
+        logger.info(json.dumps({"ts": time.time(), "metric": name, "seconds": seconds, **labels}))
+
+
+def inc(name, n=1, **labels):
+    """Add n to counter `name`."""
+    if ENABLED:
+        registry.inc(name, n, **labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Time the body of a with-block into histogram `name`, exceptions included."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name, **labels):
+    """Decorator form of timer()."""
+    def wrap(fn):
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        inner.__name__ = fn.__name__
+        inner.__doc__ = fn.__doc__
+        inner.__wrapped__ = fn
+        return inner
+    return wrap
+
+
+def add_collector(fn):
+    registry.add_collector(fn)
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, ctype = registry.prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, ctype = json.dumps(registry.snapshot()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+_BIND_FAILED = object()
+
+
+def start_server(port=METRICS_PORT, host="127.0.0.1"):
+    """
+    Serve the metrics over HTTP from a daemon thread, once per process.
+    Does nothing when no port is configured. Returns the server or None.
+    If the port cannot be bound (e.g. another replica has it), a warning
+    is logged once and the process runs without the endpoint.
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _Handler)
+            except OSError as e:
+                logger.warning("metrics server not started on %s:%s: %s", host, port, e)
+                _server = _BIND_FAILED
+            else:
+                threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return None if _server is _BIND_FAILED else _server
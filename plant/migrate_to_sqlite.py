@@ -0,0 +1,76 @@
+"""
+One-shot import of user.json, predictions and chats into the SQLite store.
+
+    python migrate_to_sqlite.py [--db agrobot.db] [--force]
+
+User ids are kept as they are, so the user_id references in predictions
+and chats stay valid. Predictions and chats are read through the same
+log replay as database.py (including the old predictions.json /
+chats.json arrays). Records saved before timestamps existed get
+created_at 0 (unknown). Refuses to run on a non-empty database unless
+--force is given, in which case the existing rows are replaced.
+"""
+import os
+import sys
+import json
+import argparse
+
+import sqlite_store
+from logstore import AppendLog
+
+
+def read_sources():
+    # imported here so the JSON paths are read even if AGROBOT_STORAGE=sqlite
+    import user
+    import database
+    users = {}
+    if os.path.exists(user.USERS_FILE) and os.stat(user.USERS_FILE).st_size > 0:
+        with open(user.USERS_FILE, "r", encoding="utf-8") as f:
+            users = json.load(f)
+    predictions = AppendLog(database.PREDICTIONS_FILE, legacy_path=database.LEGACY_PREDICTIONS_FILE).records()
+    chats = AppendLog(database.CHAT_FILE, legacy_path=database.LEGACY_CHAT_FILE).records()
+    last_id = 0
+    if os.path.exists(user.USER_SEQ_FILE):
+        with open(user.USER_SEQ_FILE, "r", encoding="utf-8") as f:
+            last_id = int(f.read().strip() or 0)
+    return users, predictions, chats, last_id
+
+
+def migrate(db_path, force=False):
+    users, predictions, chats, last_id = read_sources()
+    store = sqlite_store.SQLiteStore(db_path)
+    with store.conn() as conn:
+        existing = sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                       for t in ("users", "predictions", "chats"))
+        if existing and not force:
+            raise SystemExit(f"{db_path} already has {existing} rows; use --force to replace them.")
+        conn.execute("DELETE FROM users")
+        conn.execute("DELETE FROM predictions")
+        conn.execute("DELETE FROM chats")
+        conn.executemany(
+            "INSERT INTO users (id, username, password, is_admin) VALUES (?, ?, ?, ?)",
+            [(u["id"], name, u["password"], int(u.get("is_admin", False))) for name, u in users.items()])
+        conn.executemany(
+            "INSERT INTO predictions (user_id, disease, created_at, region) VALUES (?, ?, ?, ?)",
+            [(p["user_id"], p["disease"], p.get("timestamp", 0), p.get("region")) for p in predictions])
+        conn.executemany(
+            "INSERT INTO chats (user_id, user_message, bot_reply, created_at) VALUES (?, ?, ?, ?)",
+            [(c["user_id"], c["user_message"], c["bot_reply"], c.get("timestamp", 0)) for c in chats])
+        # keep new user ids above every id handed out by the JSON store
+        max_id = max([last_id] + [u["id"] for u in users.values()])
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'users'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('users', ?)", (max_id,))
+    return len(users), len(predictions), len(chats)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Import the JSON stores into SQLite.")
+    parser.add_argument("--db", default=sqlite_store.DB_FILE)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+    n_users, n_preds, n_chats = migrate(args.db, force=args.force)
+    print(f"Imported {n_users} users, {n_preds} predictions, {n_chats} chats into {args.db}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
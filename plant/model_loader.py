@@ -0,0 +1,45 @@
+import os
+import threading
+
+# Keeps tensorflow, cv2 and numpy off the page-render path. app.py only
+# imports this module; the inference stack is imported by the background
+# thread started here, or by the first page that actually needs it.
+PRELOAD = os.environ.get("AGROBOT_PRELOAD_MODEL", "1") != "0"
+
+_thread = None
+_lock = threading.Lock()
+
+
+def _load():
+    try:
+        import preprocess  # noqa: F401  (cv2)
+        import numpy as np
+        import inference
+        inference.load_model()
+        # also trace the uint8 graph used by the recognition page
+        inference.predict_raw(np.zeros((1,) + inference.INPUT_SHAPE, dtype=np.uint8))
+    except Exception as e:
+        # get_inference() tries again and reports the error on the page
+        print(f"Error loading model: {e}")
+
+
+def start():
+    """Start loading the model in a daemon thread, once per process (unless AGROBOT_PRELOAD_MODEL=0)."""
+    global _thread
+    if not PRELOAD:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_load, name="model-preload", daemon=True)
+            _thread.start()
+
+
+def get_inference():
+    """
+    The inference module with its model loaded. Waits for a background
+    load still in progress, or loads now. Raises if the model cannot be
+    loaded.
+    """
+    import inference
+    inference.load_model()
+    return inference
@@ -0,0 +1,133 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt releases the GIL while hashing, so logins from different sessions
+# already run in parallel on their own script threads. At most POOL_SIZE
+# hashes run at once, so a burst of logins cannot take every core. The
+# *_async variants run on a pool of that size and return a Future, for work
+# the caller does not have to wait for (e.g. rehashing after a login).
+POOL_SIZE = 4
+WORK_FACTOR = 12
+MAX_ATTEMPTS = 5          # failed logins allowed per username ...
+ATTEMPT_WINDOW = 300      # ... within this many seconds
+MAX_TRACKED_USERS = 10000
+
+_pool = None
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+_pool_lock = threading.Lock()
+
+
+def configure(pool_size=None, work_factor=None):
+    """Change the concurrency limit and/or bcrypt cost used for new hashes."""
+    global _pool, _slots, POOL_SIZE, WORK_FACTOR
+    with _pool_lock:
+        if work_factor is not None:
+            WORK_FACTOR = work_factor
+        if pool_size is not None and pool_size != POOL_SIZE:
+            POOL_SIZE = pool_size
+            _slots = threading.BoundedSemaphore(pool_size)
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+                _pool = None
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="bcrypt")
+        return _pool
+
+
+def _hash(password, rounds):
+    with _slots:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, stored_hash):
+    with _slots:
+        return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+
+
+def hash_password(password):
+    """bcrypt hash at the current WORK_FACTOR, on the calling thread."""
+    return _hash(password, WORK_FACTOR)
+
+
+def check_password(password, stored_hash):
+    """Verify a password against its bcrypt hash, on the calling thread."""
+    return _check(password, stored_hash)
+
+
+def hash_password_async(password):
+    """hash_password() on the pool; returns a Future of the hash."""
+    return _get_pool().submit(_hash, password, WORK_FACTOR)
+
+
+def check_password_async(password, stored_hash):
+    """check_password() on the pool; returns a Future of the result."""
+    return _get_pool().submit(_check, password, stored_hash)
+
+
+def needs_rehash(stored_hash):
+    """True if the hash was made with a cost other than WORK_FACTOR."""
+    try:
+        return int(stored_hash.split("$")[2]) != WORK_FACTOR
+    except (IndexError, ValueError):
+        return True
+
+
+class AttemptLimiter:
+    """
+    Sliding-window limit on failed logins per username, checked before any
+    bcrypt work is done, so one account being brute-forced cannot
+    monopolise the hashing slots. Usernames are kept in order of their
+    last failure: entries whose window has passed are swept from the old
+    end on every failure, and at most max_tracked usernames are kept.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, window=ATTEMPT_WINDOW, max_tracked=MAX_TRACKED_USERS):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._failures = OrderedDict()  # username -> failure times, oldest last failure first
+
+    def _recent(self, username, now):
+        times = [t for t in self._failures.get(username, ()) if now - t < self.window]
+        if times:
+            self._failures[username] = times
+        else:
+            self._failures.pop(username, None)
+        return times
+
+    def _sweep(self, now):
+        while self._failures:
+            username, times = next(iter(self._failures.items()))
+            if now - times[-1] < self.window and len(self._failures) <= self.max_tracked:
+                break
+            del self._failures[username]
+
+    def allowed(self, username):
+        with self._lock:
+            return len(self._recent(username, time.monotonic())) < self.max_attempts
+
+    def failed(self, username):
+        with self._lock:
+            now = time.monotonic()
+            times = self._recent(username, now)
+            times.append(now)
+            self._failures[username] = times
+            self._failures.move_to_end(username)
+            self._sweep(now)
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
+
+
+limiter = AttemptLimiter()
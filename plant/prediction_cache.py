@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Content-addressed cache of model outputs, keyed by the SHA-256 of the
+# uploaded image bytes. Entries are namespaced by the hash of the model
+# file, so replacing CNN_plant_disease_model.keras invalidates everything.
+MAX_ENTRIES = 1024
+TTL_SECONDS = 7 * 24 * 3600
+DISK_DIR = None  # e.g. "prediction_cache" to keep results across restarts
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """
+    Two-tier cache: an in-memory LRU and an optional directory of JSON
+    files. ttl is in seconds (None = never expire).
+    """
+
+    def __init__(self, model_path, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_dir=DISK_DIR):
+        self.model_path = model_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # image hash -> (stored_at, probabilities)
+        self._model_stat = None
+        self._model_hash = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _check_model(self):
+        """Re-hash the model file only when its mtime/size changed; clear memory if it did."""
+        try:
+            st = os.stat(self.model_path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat = None
+        if stat == self._model_stat:
+            return
+        model_hash = hash_file(self.model_path) if stat else None
+        if model_hash != self._model_hash:
+            self._memory.clear()
+        self._model_stat = stat
+        self._model_hash = model_hash
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, self._model_hash[:16], key + ".json")
+
+    def _disk_get(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if self._expired(entry["t"]):
+            os.remove(path)
+            return None
+        return entry["t"], np.asarray(entry["probs"], dtype="float32")
+
+    def _disk_put(self, key, stored_at, probs):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"t": stored_at, "probs": np.asarray(probs).tolist()}, f)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, data):
+        """Cached probabilities for these image bytes, or None."""
+        key = hash_bytes(data)
+        with self._lock:
+            self._check_model()
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+            if self.disk_dir and self._model_hash:
+                entry = self._disk_get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+                    return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, data, probs):
+        key = hash_bytes(data)
+        entry = (time.time(), probs)
+        with self._lock:
+            self._check_model()
+            self._remember(key, entry)
+            if self.disk_dir and self._model_hash:
+                self._disk_put(key, *entry)
+
+    def get_or_compute(self, data, compute):
+        """Return cached probabilities, or call compute() and cache its result."""
+        probs = self.get(data)
+        if probs is None:
+            probs = compute()
+            self.put(data, probs)
+        return probs
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
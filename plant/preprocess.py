@@ -0,0 +1,106 @@
+import os
+import uuid
+import threading
+
+import cv2
+import numpy as np
+
+IMAGE_SIZE = (224, 224)
+
+# Uploads are decoded straight from memory. Optionally, files larger than
+# SPILL_THRESHOLD bytes are written to SPILL_DIR first (unique name, removed
+# right after decoding), as long as the spilled files currently on disk stay
+# under SPILL_MAX_BYTES. Set SPILL_DIR to None to never touch the disk.
+SPILL_DIR = None
+SPILL_THRESHOLD = 20 * 1024 * 1024
+SPILL_MAX_BYTES = 200 * 1024 * 1024
+
+_spill_lock = threading.Lock()
+_spilled_bytes = 0
+
+
+def decode_image(data):
+    """Decode encoded image bytes (jpg/png/...) into a BGR uint8 array, or None."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def _reserve_spill(size):
+    global _spilled_bytes
+    with _spill_lock:
+        if _spilled_bytes + size > SPILL_MAX_BYTES:
+            return False
+        _spilled_bytes += size
+        return True
+
+
+def _release_spill(size):
+    global _spilled_bytes
+    with _spill_lock:
+        _spilled_bytes -= size
+
+
+def _decode_spilled(data):
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    path = os.path.join(SPILL_DIR, uuid.uuid4().hex)
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+        return cv2.imread(path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_upload(uploaded_file):
+    """Decode a Streamlit UploadedFile into a BGR uint8 array without a temp file."""
+    data = uploaded_file.getbuffer()
+    size = len(data)
+    if SPILL_DIR and size > SPILL_THRESHOLD and _reserve_spill(size):
+        try:
+            return _decode_spilled(data)
+        finally:
+            _release_spill(size)
+    return decode_image(data)
+
+
+class BatchBuffer:
+    """
+    Preallocated uint8 host batch of 224x224 BGR images, reused across
+    batches. Each image is resized straight into its slot, so building a
+    batch allocates nothing; channel swap and scaling are left to the
+    model graph (see fused_model.py). Every batch, a single image too, is
+    resized here the same way, so an image gets the same model input
+    whatever it was batched with. Grows if a batch does not fit.
+    Not thread-safe: one buffer per batching worker.
+    """
+
+    def __init__(self, capacity):
+        self.array = np.empty((capacity, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.uint8)
+
+    def fill(self, images):
+        n = len(images)
+        if n > len(self.array):
+            self.array = np.empty((n,) + self.array.shape[1:], dtype=np.uint8)
+        for slot, img in zip(self.array, images):
+            if img.shape == slot.shape:
+                slot[...] = img
+            else:
+                cv2.resize(img, IMAGE_SIZE, dst=slot)
+        return self.array[:n]
+
+
+def resize(img):
+    """BGR uint8 image -> BGR uint8 at the model's 224x224 input size (as BatchBuffer stores it)."""
+    if img.shape[:2] == (IMAGE_SIZE[1], IMAGE_SIZE[0]):
+        return img
+    return cv2.resize(img, IMAGE_SIZE)
+
+
+def prepare(img):
+    """BGR uint8 image -> RGB float32 (224, 224, 3) in [0, 1], ready for the model."""
+    img = cv2.resize(img, IMAGE_SIZE)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    out = img.astype("float32")
+    out *= 1.0 / 255.0
+    return out
@@ -0,0 +1,429 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Optional SQLite storage for users, predictions and chats. Selected with
+# AGROBOT_STORAGE=sqlite; user.py and database.py keep their public
+# functions and route them here. Use migrate_to_sqlite.py to import the
+# existing JSON files once.
+STORAGE_BACKEND = os.environ.get("AGROBOT_STORAGE", "json")
+DB_FILE = os.environ.get("AGROBOT_DB", "agrobot.db")
+POOL_SIZE = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    disease TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    region TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_user ON predictions (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_time ON predictions (created_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_disease ON predictions (disease, id);
+CREATE TABLE IF NOT EXISTS chats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    user_message TEXT NOT NULL,
+    bot_reply TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chats_user ON chats (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_chats_time ON chats (created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('users_version', 0);
+CREATE TRIGGER IF NOT EXISTS users_ins AFTER INSERT ON users BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'users_version';
+END;
+CREATE TRIGGER IF NOT EXISTS users_upd AFTER UPDATE ON users BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'users_version';
+END;
+CREATE TRIGGER IF NOT EXISTS users_del AFTER DELETE ON users BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'users_version';
+END;
+"""
+
+# Prediction counts per disease, user, disease+day, disease+hour and
+# region+disease, kept up to date by triggers on every insert/delete.
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (dim, key)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS predictions_rollup_ins AFTER INSERT ON predictions BEGIN
+    INSERT INTO rollups (dim, key, n) VALUES
+        ('disease', NEW.disease, 1),
+        ('user', CAST(NEW.user_id AS TEXT), 1),
+        ('day', NEW.disease || '|' || CAST(CAST(NEW.created_at / 86400 AS INTEGER) AS TEXT), 1),
+        ('hour', NEW.disease || '|' || CAST(CAST(NEW.created_at / 3600 AS INTEGER) AS TEXT), 1),
+        ('region', COALESCE(NEW.region, '') || '|' || NEW.disease, 1)
+    ON CONFLICT (dim, key) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS predictions_rollup_del AFTER DELETE ON predictions BEGIN
+    UPDATE rollups SET n = n - 1 WHERE dim = 'disease' AND key = OLD.disease;
+    UPDATE rollups SET n = n - 1 WHERE dim = 'user' AND key = CAST(OLD.user_id AS TEXT);
+    UPDATE rollups SET n = n - 1 WHERE dim = 'day'
+        AND key = OLD.disease || '|' || CAST(CAST(OLD.created_at / 86400 AS INTEGER) AS TEXT);
+    UPDATE rollups SET n = n - 1 WHERE dim = 'hour'
+        AND key = OLD.disease || '|' || CAST(CAST(OLD.created_at / 3600 AS INTEGER) AS TEXT);
+    UPDATE rollups SET n = n - 1 WHERE dim = 'region'
+        AND key = COALESCE(OLD.region, '') || '|' || OLD.disease;
+END;
+"""
+
+PREDICTION_COLUMNS = "user_id, disease, region, created_at AS timestamp"
+CHAT_COLUMNS = "user_id, user_message, bot_reply, created_at AS timestamp"
+
+
+class SQLiteStore:
+    """
+    A small pool of connections shared by all threads: Streamlit runs
+    every rerun on a new thread, so per-thread connections would be opened
+    (and their PRAGMAs run) again on each rerun. At most pool_size idle
+    connections are kept; busier callers open extra ones that are closed
+    after use. WAL mode lets readers run while a write is in progress.
+    All queries use fixed SQL with parameters, so sqlite3's statement
+    cache keeps them prepared.
+    """
+
+    def __init__(self, path=DB_FILE, pool_size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, cached_statements=256, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._upgrade(conn)
+                self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def conn(self):
+        """
+        A pooled connection for the duration of the block, used as a
+        transaction: committed if the block succeeds, rolled back if not.
+        Materialize query results inside the block.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _upgrade(self, conn):
+        """Bring databases created by older versions up to the current schema."""
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(predictions)")}
+        with conn:
+            if "region" not in columns:
+                conn.execute("ALTER TABLE predictions ADD COLUMN region TEXT")
+            has_rollups = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'").fetchone()
+        conn.executescript(ROLLUP_SCHEMA)
+        if not has_rollups:
+            self.rebuild_rollups(conn)
+
+    def rebuild_rollups(self, conn=None):
+        """Recompute the rollups table from scratch (one scan of predictions)."""
+        if conn is None:
+            with self.conn() as conn:
+                return self.rebuild_rollups(conn)
+        with conn:
+            conn.execute("DELETE FROM rollups")
+            conn.execute("""
+                INSERT INTO rollups (dim, key, n)
+                SELECT 'disease', disease, COUNT(*) FROM predictions GROUP BY 1, 2
+                UNION ALL
+                SELECT 'user', CAST(user_id AS TEXT), COUNT(*) FROM predictions GROUP BY 1, 2
+                UNION ALL
+                SELECT 'day', disease || '|' || CAST(CAST(created_at / 86400 AS INTEGER) AS TEXT), COUNT(*)
+                FROM predictions GROUP BY 1, 2
+                UNION ALL
+                SELECT 'hour', disease || '|' || CAST(CAST(created_at / 3600 AS INTEGER) AS TEXT), COUNT(*)
+                FROM predictions GROUP BY 1, 2
+                UNION ALL
+                SELECT 'region', COALESCE(region, '') || '|' || disease, COUNT(*) FROM predictions GROUP BY 1, 2
+            """)
+
+    def rollup_counts(self, dim):
+        with self.conn() as conn:
+            rows = conn.execute("SELECT key, n FROM rollups WHERE dim = ? AND n > 0", (dim,))
+            return {r["key"]: r["n"] for r in rows}
+
+    def rollup_count(self, dim, key):
+        with self.conn() as conn:
+            row = conn.execute("SELECT n FROM rollups WHERE dim = ? AND key = ?", (dim, key)).fetchone()
+        return row["n"] if row else 0
+
+    def rollup_count_many(self, dim, keys, chunk=500):
+        """[count of each key], in as few queries as SQLite's parameter limit allows."""
+        keys = list(keys)
+        found = {}
+        with self.conn() as conn:
+            for i in range(0, len(keys), chunk):
+                part = keys[i:i + chunk]
+                rows = conn.execute(
+                    f"SELECT key, n FROM rollups WHERE dim = ? AND key IN ({','.join('?' * len(part))})",
+                    [dim] + part)
+                found.update((r["key"], r["n"]) for r in rows)
+        return [found.get(key, 0) for key in keys]
+
+    # ---------- users ----------
+
+    def users_version(self):
+        with self.conn() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'users_version'").fetchone()[0]
+
+    def users(self):
+        with self.conn() as conn:
+            rows = conn.execute("SELECT id, username, password, is_admin FROM users ORDER BY id")
+            return {r["username"]: {"password": r["password"], "is_admin": bool(r["is_admin"]), "id": r["id"]}
+                    for r in rows}
+
+    def add_user(self, username, password_hash, is_admin=False):
+        """Insert a user, returns the new id or None if the name is taken."""
+        with self.conn() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password, is_admin) VALUES (?, ?, ?)",
+                (username, password_hash, int(is_admin)))
+            return cur.lastrowid if cur.rowcount else None
+
+    def remove_user(self, username):
+        with self.conn() as conn:
+            return conn.execute("DELETE FROM users WHERE username = ?", (username,)).rowcount > 0
+
+    def set_password(self, username, password_hash):
+        with self.conn() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (password_hash, username))
+
+    def delete_users(self, usernames):
+        """
+        Delete users and all their predictions and chats in one transaction.
+        Returns (users removed, predictions removed, chats removed).
+        """
+        usernames = list(usernames)
+        if not usernames:
+            return 0, 0, 0
+        marks = ",".join("?" * len(usernames))
+        with self.conn() as conn:
+            ids = [r[0] for r in conn.execute(f"SELECT id FROM users WHERE username IN ({marks})", usernames)]
+            if not ids:
+                return 0, 0, 0
+            n_preds, n_chats = self._delete_for_users(conn, ids)
+            n_users = conn.execute(f"DELETE FROM users WHERE username IN ({marks})", usernames).rowcount
+        return n_users, n_preds, n_chats
+
+    def _delete_for_users(self, conn, user_ids):
+        marks = ",".join("?" * len(user_ids))
+        n_preds = conn.execute(f"DELETE FROM predictions WHERE user_id IN ({marks})", user_ids).rowcount
+        n_chats = conn.execute(f"DELETE FROM chats WHERE user_id IN ({marks})", user_ids).rowcount
+        return n_preds, n_chats
+
+    def delete_for_users(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0, 0
+        with self.conn() as conn:
+            return self._delete_for_users(conn, user_ids)
+
+    def replace_users(self, users):
+        with self.conn() as conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (id, username, password, is_admin) VALUES (?, ?, ?, ?)",
+                [(u["id"], name, u["password"], int(u.get("is_admin", False))) for name, u in users.items()])
+
+    # ---------- predictions ----------
+
+    def save_prediction(self, user_id, disease, region=None):
+        with self.conn() as conn:
+            conn.execute("INSERT INTO predictions (user_id, disease, created_at, region) VALUES (?, ?, ?, ?)",
+                         (user_id, disease, time.time(), region))
+
+    def save_predictions(self, user_id, diseases, region=None):
+        now = time.time()
+        with self.conn() as conn:
+            return conn.executemany(
+                "INSERT INTO predictions (user_id, disease, created_at, region) VALUES (?, ?, ?, ?)",
+                [(user_id, disease, now, region) for disease in diseases]).rowcount
+
+    def load_predictions(self):
+        with self.conn() as conn:
+            rows = conn.execute(f"SELECT {PREDICTION_COLUMNS} FROM predictions ORDER BY id")
+            return [dict(r) for r in rows]
+
+    def get_user_predictions(self, user_id):
+        with self.conn() as conn:
+            rows = conn.execute(
+                f"SELECT {PREDICTION_COLUMNS} FROM predictions WHERE user_id = ? ORDER BY id", (user_id,))
+            return [dict(r) for r in rows]
+
+    def delete_predictions_by_user(self, user_id):
+        with self.conn() as conn:
+            return conn.execute("DELETE FROM predictions WHERE user_id = ?", (user_id,)).rowcount
+
+    def delete_prediction_at_index(self, idx):
+        if idx < 0:
+            return False
+        with self.conn() as conn:
+            return conn.execute(
+                "DELETE FROM predictions WHERE id = "
+                "(SELECT id FROM predictions ORDER BY id LIMIT 1 OFFSET ?)", (idx,)).rowcount > 0
+
+    def clear_predictions(self):
+        with self.conn() as conn:
+            conn.execute("DELETE FROM predictions")
+
+    def _where(self, user_id=None, disease=None, since=None, until=None):
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if disease is not None:
+            clauses.append("disease = ?")
+            params.append(disease)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, table, columns, offset, limit, **filters):
+        where, params = self._where(**filters)
+        with self.conn() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT id, {columns} FROM {table}{where} ORDER BY id LIMIT ? OFFSET ?",
+                                params + [limit, offset])
+            return [dict(r) for r in rows], total
+
+    def query_predictions(self, offset=0, limit=50, user_id=None, disease=None, since=None, until=None):
+        return self._query("predictions", PREDICTION_COLUMNS, offset, limit,
+                           user_id=user_id, disease=disease, since=since, until=until)
+
+    def delete_prediction(self, record_id):
+        with self.conn() as conn:
+            return conn.execute("DELETE FROM predictions WHERE id = ?", (record_id,)).rowcount > 0
+
+    # ---------- chats ----------
+
+    def save_chat_message(self, user_id, user_message, bot_reply):
+        with self.conn() as conn:
+            conn.execute(
+                "INSERT INTO chats (user_id, user_message, bot_reply, created_at) VALUES (?, ?, ?, ?)",
+                (user_id, user_message, bot_reply, time.time()))
+
+    def load_chats(self):
+        with self.conn() as conn:
+            rows = conn.execute(f"SELECT {CHAT_COLUMNS} FROM chats ORDER BY id")
+            return [dict(r) for r in rows]
+
+    def save_chats(self, chats):
+        now = time.time()
+        with self.conn() as conn:
+            conn.execute("DELETE FROM chats")
+            conn.executemany(
+                "INSERT INTO chats (user_id, user_message, bot_reply, created_at) VALUES (?, ?, ?, ?)",
+                [(c["user_id"], c["user_message"], c["bot_reply"], c.get("timestamp", now)) for c in chats])
+
+    def get_user_chats(self, user_id):
+        with self.conn() as conn:
+            rows = conn.execute(
+                f"SELECT {CHAT_COLUMNS} FROM chats WHERE user_id = ? ORDER BY id", (user_id,))
+            return [dict(r) for r in rows]
+
+    def delete_chat_at_index(self, index, user_id=None):
+        if index < 0:
+            return False
+        with self.conn() as conn:
+            if user_id is not None:
+                cur = conn.execute(
+                    "DELETE FROM chats WHERE id = (SELECT id FROM chats WHERE user_id = ? "
+                    "ORDER BY id LIMIT 1 OFFSET ?)", (user_id, index))
+            else:
+                cur = conn.execute(
+                    "DELETE FROM chats WHERE id = (SELECT id FROM chats ORDER BY id LIMIT 1 OFFSET ?)",
+                    (index,))
+            return cur.rowcount > 0
+
+    def delete_chats_by_user(self, user_id):
+        with self.conn() as conn:
+            conn.execute("DELETE FROM chats WHERE user_id = ?", (user_id,))
+        return True
+
+    def query_chats(self, offset=0, limit=50, user_id=None, since=None, until=None):
+        return self._query("chats", CHAT_COLUMNS, offset, limit,
+                           user_id=user_id, since=since, until=until)
+
+    def latest_user_chats(self, user_id, limit=20, before=None):
+        sql = f"SELECT id, {CHAT_COLUMNS} FROM chats WHERE user_id = ?"
+        params = [user_id]
+        if before is not None:
+            sql += " AND id < ?"
+            params.append(before)
+        with self.conn() as conn:
+            rows = [dict(r) for r in conn.execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit + 1])]
+        cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], cursor
+
+    def delete_chat(self, record_id):
+        with self.conn() as conn:
+            return conn.execute("DELETE FROM chats WHERE id = ?", (record_id,)).rowcount > 0
+
+    def flush(self):
+        """Every write commits when it is made; kept for parity with the log store."""
+
+    def compact(self):
+        with self.conn() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide SQLiteStore for DB_FILE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(DB_FILE)
+        return _store
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the app's modules live in plant/, next to this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
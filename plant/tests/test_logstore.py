@@ -0,0 +1,138 @@
+import threading
+import multiprocessing
+
+import database
+from logstore import AppendLog
+
+
+def test_newest_without_log_file(tmp_path):
+    log = AppendLog(str(tmp_path / "chats.jsonl"))
+    assert log.newest(20) == []
+    assert log.newest(20, key=1) == []
+
+
+def test_newest_for_key_without_records(tmp_path):
+    log = AppendLog(str(tmp_path / "chats.jsonl"))
+    log.extend([{"user_id": 1, "n": 1}])
+    assert log.newest(20, key=2) == []
+    assert [rec["n"] for _, rec in log.newest(20, key=1)] == [1]
+
+
+def test_latest_user_chats_on_fresh_install(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "_chats", AppendLog(database.CHAT_FILE, legacy_path=database.LEGACY_CHAT_FILE))
+    assert database.latest_user_chats(1) == ([], None)
+
+
+def test_delete_and_compact_round_trip(tmp_path):
+    log = AppendLog(str(tmp_path / "chats.jsonl"), compact_min=10 ** 6)
+    log.extend([{"user_id": i % 2, "n": i} for i in range(10)])
+    assert log.delete([1, 4, 4, 99]) == 2
+    live = [rid for rid, _ in log.entries()]
+    assert live == [2, 3, 5, 6, 7, 8, 9, 10]
+
+    log.compact()
+    assert [rid for rid, _ in log.entries()] == live
+    assert [rid for rid, _ in log.find(1)] == [2, 6, 8, 10]
+    # the tombstones are gone from the file, only the id high-water mark is left
+    with open(log.path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == len(live)
+
+    log.delete([10])
+    log.compact()
+    log.extend([{"user_id": 0, "n": 10}])
+    assert log.entries()[-1][0] == 11  # ids are never reused
+
+
+def test_rewrite_keeps_queued_records_and_ids_increasing(tmp_path):
+    log = AppendLog(str(tmp_path / "predictions.jsonl"), flush_interval=60)
+    log.extend([{"user_id": 1, "n": 0}, {"user_id": 1, "n": 1}])
+    log.append({"user_id": 1, "n": 2})
+    log.rewrite([{"user_id": 2, "n": 3}])
+    assert [(rid, rec["n"]) for rid, rec in log.entries()] == [(4, 3)]
+
+
+def test_index_follows_foreign_writes_and_rewrites(tmp_path):
+    path = str(tmp_path / "chats.jsonl")
+    ours, theirs = AppendLog(path), AppendLog(path)
+    ours.extend([{"user_id": 1, "n": i} for i in range(3)])
+    assert [rec["n"] for _, rec in ours.find(1)] == [0, 1, 2]
+
+    theirs.extend([{"user_id": 2, "n": 3}, {"user_id": 1, "n": 4}])
+    assert [rec["n"] for _, rec in ours.find(1)] == [0, 1, 2, 4]
+
+    theirs.delete([1, 2])
+    theirs.compact()
+    assert [rec["n"] for _, rec in ours.find(1)] == [2, 4]
+    assert [rec["n"] for _, rec in ours.newest(10, key=2)] == [3]
+
+    theirs.rewrite([{"user_id": 2, "n": 5}])
+    assert ours.find(1) == []
+    assert [rec["n"] for _, rec in ours.page(0, 10)[0]] == [5]
+
+
+def _write_from_threads(path, proc, threads, records):
+    log = AppendLog(path)
+
+    def write(thread):
+        for i in range(records):
+            log.append({"user_id": proc, "thread": thread, "n": i})
+
+    workers = [threading.Thread(target=write, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    log.flush()
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    path = str(tmp_path / "chats.jsonl")
+    procs = [multiprocessing.Process(target=_write_from_threads, args=(path, p, 4, 50))
+             for p in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+
+    entries = AppendLog(path).entries()
+    seen = {(rec["user_id"], rec["thread"], rec["n"]) for _, rec in entries}
+    assert len(entries) == len(seen) == len({rid for rid, _ in entries}) == 3 * 4 * 50
+
+
+def _churn(path, rounds):
+    """Keep appending, deleting and compacting; user 2's records are removed again."""
+    log = AppendLog(path, compact_min=10 ** 6)
+    for _ in range(rounds):
+        log.extend([{"user_id": 2, "secret": True}] * 5 + [{"user_id": 1}])
+        log.delete(rid for rid, rec in log.entries() if rec["user_id"] == 2)
+        log.compact()
+
+
+def _read_own(path, rounds, failures):
+    log = AppendLog(path)
+    try:
+        for _ in range(rounds):
+            rows = log.find(1) + log.newest(10, key=1) + log.page(0, 10, key=1)[0]
+            if any(rec["user_id"] != 1 for _, rec in rows):
+                failures.put("read another user's record")
+                return
+    except Exception as e:
+        failures.put(f"{type(e).__name__}: {e}")
+
+
+def test_reads_during_foreign_compaction(tmp_path):
+    path = str(tmp_path / "chats.jsonl")
+    AppendLog(path).extend([{"user_id": 1}])
+    failures = multiprocessing.Queue()
+    writer = multiprocessing.Process(target=_churn, args=(path, 150))
+    readers = [multiprocessing.Process(target=_read_own, args=(path, 400, failures))
+               for _ in range(2)]
+    for p in [writer] + readers:
+        p.start()
+    for p in [writer] + readers:
+        p.join()
+    assert writer.exitcode == 0
+    assert failures.empty(), failures.get()
@@ -0,0 +1,32 @@
+import multiprocessing
+
+import user
+
+
+def _register(prefix, n):
+    registry = user._Registry()
+    for i in range(n):
+        assert registry.add(f"{prefix}{i}", "hash") is not None
+
+
+def test_concurrent_registrations_keep_every_user(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    procs = [multiprocessing.Process(target=_register, args=(f"p{p}_", 20)) for p in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+
+    users = user._Registry().refresh().users
+    ids = [u["id"] for u in users.values()]
+    assert len(users) == len(set(ids)) == 60
+
+
+def test_registry_sees_a_same_size_rewrite(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ours, theirs = user._Registry(), user._Registry()
+    theirs.add("alice", "hash-1")
+    assert ours.refresh().users["alice"]["password"] == "hash-1"
+    theirs.set_password("alice", "hash-2")  # same size, possibly the same mtime
+    assert ours.refresh().users["alice"]["password"] == "hash-2"
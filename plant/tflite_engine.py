@@ -0,0 +1,196 @@
+"""
+TensorFlow Lite variants of the CNN and the interpreter wrapper that runs them.
+
+    python tflite_engine.py export [--variants int8,fp16]
+    python tflite_engine.py parity [IMAGES...] [--out parity_report.json]
+
+`export` converts CNN_plant_disease_model.keras into
+  - CNN_plant_disease_model_int8.tflite: dynamic-range quantization
+    (int8 weights, float activations), about 1/4 of the size
+  - CNN_plant_disease_model_fp16.tflite: float16 weights, about 1/2
+
+`parity` runs the Keras model and every exported variant over a sample
+set (the JPGs in this directory plus any files or directories given) and
+reports top-1 agreement with Keras, the largest probability difference,
+mean per-image latency, file size and resident memory taken by loading.
+
+The app uses a variant when AGROBOT_ENGINE=tflite-int8 or tflite-fp16
+(see inference.py). The interpreter runs on XNNPACK, TFLite's default
+CPU delegate, with one thread per core.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import threading
+
+import numpy as np
+
+VARIANTS = ["int8", "fp16"]
+
+
+def variant_path(keras_path, variant):
+    return f"{os.path.splitext(keras_path)[0]}_{variant}.tflite"
+
+
+def convert(keras_path, variant):
+    """Serialized TFLite model for `variant` ("int8" or "fp16")."""
+    import tensorflow as tf
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown TFLite variant: {variant}")
+    model = tf.keras.models.load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "fp16":
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def export(keras_path, variants=VARIANTS):
+    """Write every variant next to the Keras file, returns {variant: path}."""
+    paths = {}
+    for variant in variants:
+        path = variant_path(keras_path, variant)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(convert(keras_path, variant))
+        os.replace(tmp_path, path)
+        paths[variant] = path
+    return paths
+
+
+class TFLiteModel:
+    """
+    A TFLite interpreter with the Keras predict() call signature, so
+    inference.py can use either. The input tensor is resized only when
+    the batch size changes. Calls are serialized: one interpreter is not
+    safe to invoke from several threads.
+    """
+
+    def __init__(self, path, num_threads=None):
+        import tensorflow as tf
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+        self.path = path
+        self._interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads or os.cpu_count())
+        self._input = self._interpreter.get_input_details()[0]["index"]
+        self._output = self._interpreter.get_output_details()[0]["index"]
+        self._batch = None
+        self._lock = threading.Lock()
+
+    def predict(self, images, verbose=0):
+        images = np.ascontiguousarray(images, dtype=np.float32)
+        with self._lock:
+            if images.shape[0] != self._batch:
+                self._interpreter.resize_tensor_input(self._input, images.shape)
+                self._interpreter.allocate_tensors()
+                self._batch = images.shape[0]
+            self._interpreter.set_tensor(self._input, images)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output).copy()
+
+    predict_on_batch = predict
+
+
+# ---------- parity report ----------
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def sample_images(extra=()):
+    import diagnose_batch
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(p for p in glob.glob(os.path.join(here, "*"))
+                   if os.path.splitext(p)[1].lower() in (".jpg", ".jpeg"))
+    return paths + diagnose_batch.collect_paths(extra)
+
+
+def _load(engine, keras_path):
+    import tensorflow as tf
+    if engine == "keras":
+        return tf.keras.models.load_model(keras_path)
+    return TFLiteModel(variant_path(keras_path, engine))
+
+
+def parity(keras_path, paths, variants=VARIANTS):
+    """Compare each exported variant with the Keras model on `paths`."""
+    import preprocess
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            img = preprocess.decode_image(f.read())
+        if img is not None:
+            images.append((path, preprocess.prepare(img)[np.newaxis]))
+    if not images:
+        raise ValueError(f"None of the {len(paths)} sample image(s) could be decoded")
+
+    report = {"images": [p for p, _ in images], "engines": {}}
+    reference = None
+    for engine in ["keras"] + [v for v in variants if os.path.exists(variant_path(keras_path, v))]:
+        rss = _rss_bytes()
+        model = _load(engine, keras_path)
+        model.predict(np.zeros_like(images[0][1]), verbose=0)  # warm-up
+        loaded_rss = _rss_bytes()
+        timings, outputs = [], []
+        for _, batch in images:
+            start = time.perf_counter()
+            outputs.append(np.asarray(model.predict(batch, verbose=0))[0])
+            timings.append(time.perf_counter() - start)
+        outputs = np.stack(outputs)
+        file_path = keras_path if engine == "keras" else variant_path(keras_path, engine)
+        entry = {
+            "file_bytes": os.path.getsize(file_path),
+            "load_rss_bytes": loaded_rss - rss if rss is not None and loaded_rss is not None else None,
+            "mean_latency_ms": float(np.mean(timings) * 1000),
+            "top1": [int(i) for i in outputs.argmax(axis=1)],
+        }
+        if reference is None:
+            reference = outputs
+        else:
+            entry["top1_agreement"] = float(np.mean(outputs.argmax(axis=1) == reference.argmax(axis=1)))
+            entry["max_abs_prob_diff"] = float(np.abs(outputs - reference).max())
+        report["engines"][engine] = entry
+        del model
+    return report
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export TFLite variants of the CNN and check their parity.")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("images", nargs="*", help="extra images or directories for the parity set")
+    parser.add_argument("--model", default="CNN_plant_disease_model.keras")
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--out", default="parity_report.json")
+    args = parser.parse_args(argv)
+    variants = [v for v in args.variants.split(",") if v]
+
+    if args.command == "export":
+        for variant, path in export(args.model, variants).items():
+            print(f"{variant}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        return
+
+    paths = sample_images(args.images)
+    if not paths:
+        parser.error("no sample images found")
+    try:
+        report = parity(args.model, paths, variants)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"{'engine':12s} {'MB':>7s} {'load RSS MB':>12s} {'ms/image':>9s} {'top-1 agree':>12s}")
+    for engine, e in report["engines"].items():
+        rss = f"{e['load_rss_bytes'] / 1e6:.1f}" if e["load_rss_bytes"] is not None else "-"
+        agree = f"{e['top1_agreement']:.1%}" if "top1_agreement" in e else "-"
+        print(f"{engine:12s} {e['file_bytes'] / 1e6:7.1f} {rss:>12s} {e['mean_latency_ms']:9.2f} {agree:>12s}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
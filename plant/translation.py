@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import threading
+
+import metrics
+
+# Cached translation layer in front of googletrans. Lookups go
+#   prebuilt UI catalog -> persistent (text, src, dest) cache -> backend,
+# and everything missing is sent to the backend in one batch call, so
+# rendering a page does not depend on the translation service once the
+# strings have been seen. Both files are generated at runtime and are not
+# shipped: ui_catalog.json is optional and written by
+# `python translation.py`.
+#
+# After a backend failure the backend is not called again for
+# BACKOFF_MIN seconds (doubling per failure, up to BACKOFF_MAX); in the
+# meantime misses fall back to the untranslated text at once instead of
+# waiting on a service that is down on every rerun.
+CACHE_FILE = "translation_cache.jsonl"
+CATALOG_FILE = "ui_catalog.json"
+BACKOFF_MIN = 30
+BACKOFF_MAX = 600
+
+lang_dict = {
+    "English": "en",
+    "Hindi": "hi",
+    "Bengali": "bn",
+    "Marathi": "mr",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Gujarati": "gu",
+    "Kannada": "kn",
+    "Malayalam": "ml",
+    "Punjabi": "pa",
+    "Odia": "or",
+    "Assamese": "as",
+    "Urdu": "ur"
+}
+
+# Static labels shown by app.py; the catalog is built from this list.
+UI_STRINGS = [
+    "Disease Recognition: Detect and Ask",
+    "Upload an image to detect plant diseases:",
+    "Uploaded Image",
+    "Loading model...",
+    "Predict",
+    "Model predicts:",
+    "Advisory:",
+    "Recommended Products:",
+    "💬 Ask PlantDoctor",
+    "Ask PlantDoctor about your plant...",
+    "Sorry, I couldn't identify the plant disease. Please try again or upload an image.",
+]
+
+
+class GoogleBackend:
+    """googletrans, one request for the whole batch."""
+
+    def __init__(self):
+        from googletrans import Translator
+        self._translator = Translator()
+
+    def translate_batch(self, texts, dest, src="auto"):
+        results = self._translator.translate(list(texts), dest=dest, src=src)
+        return [r.text for r in results]
+
+
+class OfflineBackend:
+    """Local stand-in that returns the text unchanged; for tests and offline runs."""
+
+    def translate_batch(self, texts, dest, src="auto"):
+        return list(texts)
+
+
+class TranslationService:
+
+    def __init__(self, backend=None, cache_file=CACHE_FILE, catalog_file=CATALOG_FILE):
+        self._backend = backend
+        self.cache_file = cache_file
+        self.catalog_file = catalog_file
+        self._lock = threading.Lock()
+        self._cache = None
+        self._catalog = None
+        self.backend_calls = 0
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = GoogleBackend()
+        return self._backend
+
+    def set_backend(self, backend):
+        self._backend = backend
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def _load(self):
+        if self._cache is not None:
+            return
+        self._cache = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._cache[(e["text"], e["src"], e["dest"])] = e["out"]
+        self._catalog = {}
+        if self.catalog_file and os.path.exists(self.catalog_file):
+            with open(self.catalog_file, "r", encoding="utf-8") as f:
+                self._catalog = json.load(f)
+
+    def _lookup(self, text, src, dest):
+        if src == "en":
+            found = self._catalog.get(dest, {}).get(text)
+            if found is not None:
+                return found
+        return self._cache.get((text, src, dest))
+
+    def translate_many(self, texts, dest, src="en", cache=True):
+        """
+        Translate a list of strings. Anything not in the catalog or cache is
+        sent to the backend in a single call. With cache=False (free-form
+        user input) nothing is looked up or stored.
+        If the backend fails, or failed less than a backoff window ago, the
+        untranslated text is returned.
+        """
+        texts = list(texts)
+        if dest == src:
+            return texts
+        with self._lock:
+            self._load()
+            out = [self._lookup(t, src, dest) if cache else None for t in texts]
+        missing = list(dict.fromkeys(t for t, o in zip(texts, out) if o is None and t))
+        metrics.inc("translate_lookups", len(texts) - len(missing), result="hit")
+        if missing:
+            metrics.inc("translate_lookups", len(missing), result="miss")
+            translated = {}
+            if time.monotonic() < self._retry_at:
+                # backend failed recently: don't wait on it again yet
+                metrics.inc("translate_skipped", len(missing), dest=dest)
+            else:
+                try:
+                    self.backend_calls += 1
+                    with metrics.timer("translate_backend", dest=dest):
+                        translated = dict(zip(missing, self.backend.translate_batch(missing, dest=dest, src=src)))
+                except Exception as e:
+                    self._backoff()
+                    print(f"Translation failed ({dest}): {e}; retrying in {self._retry_at - time.monotonic():.0f}s")
+                    metrics.inc("translate_errors", dest=dest)
+                else:
+                    self._failures = 0
+            if cache and translated:
+                self._store(translated, src, dest)
+            out = [o if o is not None else translated.get(t, t) for t, o in zip(texts, out)]
+        return out
+
+    def _backoff(self):
+        with self._lock:
+            self._failures += 1
+            delay = min(BACKOFF_MIN * 2 ** (self._failures - 1), BACKOFF_MAX)
+            self._retry_at = time.monotonic() + delay
+
+    def translate(self, text, dest, src="en", cache=True):
+        return self.translate_many([text], dest, src=src, cache=cache)[0]
+
+    def _store(self, translated, src, dest):
+        with self._lock:
+            lines = []
+            for text, result in translated.items():
+                self._cache[(text, src, dest)] = result
+                lines.append(json.dumps({"text": text, "src": src, "dest": dest, "out": result},
+                                        ensure_ascii=False) + "\n")
+            if self.cache_file:
+                with open(self.cache_file, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+
+    def prefetch(self, dest):
+        """Warm every static UI string for one language in a single batch."""
+        self.translate_many(UI_STRINGS, dest)
+
+    def build_catalog(self, strings=UI_STRINGS, languages=None):
+        """Translate `strings` into every language and write the catalog file."""
+        languages = languages or [c for c in lang_dict.values() if c != "en"]
+        catalog = {}
+        for dest in languages:
+            catalog[dest] = dict(zip(strings, self.backend.translate_batch(strings, dest=dest, src="en")))
+        tmp_path = self.catalog_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.catalog_file)
+        with self._lock:
+            self._catalog = catalog
+        return catalog
+
+
+_service = TranslationService()
+
+
+def tr(text, dest, src="en", cache=True):
+    """Translate one string through the shared service."""
+    return _service.translate(text, dest, src=src, cache=cache)
+
+
+def tr_many(texts, dest, src="en", cache=True):
+    return _service.translate_many(texts, dest, src=src, cache=cache)
+
+
+def prefetch(dest):
+    _service.prefetch(dest)
+
+
+def set_backend(backend):
+    _service.set_backend(backend)
+
+
+if __name__ == "__main__":
+    # Offline step: python translation.py  -> writes ui_catalog.json
+    catalog = _service.build_catalog(languages=sys.argv[1:] or None)
+    print(f"Wrote {CATALOG_FILE} with {len(catalog)} languages x {len(UI_STRINGS)} strings")
@@ -1,51 +1,250 @@
 import os
 import json
-import bcrypt
+import copy
+import threading
+from contextlib import contextmanager
+
+import database
+import password_hashing
+import sqlite_store
+from logstore import file_lock
 
 USERS_FILE = "user.json"
+# highest user id ever issued; ids are never reused, even after deletes
+USER_SEQ_FILE = "user.seq"
+
+
+class _Registry:
+    """
+    In-memory copy of USERS_FILE with username -> record and id -> username
+    maps. It is reloaded only when the file's inode/mtime/size changes, so
+    the lookups done on every page render do not touch the disk. Updates
+    are read-modify-write under an exclusive lock on `<USERS_FILE>.lock`,
+    so several processes can register users without losing updates or
+    issuing the same id.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._flock_depth = 0
+        self._loaded = False
+        self._version = None
+        self.users = {}
+        self.by_id = {}
+
+    def current_version(self):
+        try:
+            st = os.stat(USERS_FILE)
+        except FileNotFoundError:
+            return None
+        # the inode catches a same-size os.replace() within the mtime granularity
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @contextmanager
+    def locked(self):
+        """Thread lock plus an exclusive OS lock on USERS_FILE + ".lock" (re-entrant)."""
+        with self.lock:
+            if self._flock_depth:
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                return
+            with file_lock(USERS_FILE + ".lock"):
+                self._flock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth = 0
+
+    def read(self):
+        if not os.path.exists(USERS_FILE) or os.stat(USERS_FILE).st_size == 0:
+            return {}
+        with open(USERS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def refresh(self):
+        version = self.current_version()
+        if self._loaded and version == self._version:
+            return self
+        with self.lock:
+            self._set(self.read(), version)
+        return self
+
+    def _set(self, users, version):
+        self.users = users
+        self.by_id = {u["id"]: name for name, u in users.items()}
+        self._version = version
+        self._loaded = True
+
+    def store(self, users):
+        with self.locked():
+            tmp_path = USERS_FILE + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(users, f, indent=4)
+            os.replace(tmp_path, USERS_FILE)
+            self._set(users, self.current_version())
+
+    def next_id(self):
+        """Reserve a new user id, larger than any id issued before."""
+        with self.locked():
+            last = max(self.by_id, default=0)
+            if os.path.exists(USER_SEQ_FILE):
+                with open(USER_SEQ_FILE, "r", encoding="utf-8") as f:
+                    last = max(last, int(f.read().strip() or 0))
+            with open(USER_SEQ_FILE, "w", encoding="utf-8") as f:
+                f.write(str(last + 1))
+            return last + 1
+
+    # The cached dicts are shared with readers, so updates build new ones.
+
+    def add(self, username, password_hash, is_admin=False):
+        """Add a user, returns the new id or None if the name is taken."""
+        with self.locked():
+            users = dict(self.refresh().users)
+            if username in users:
+                return None
+            user_id = self.next_id()
+            users[username] = {"password": password_hash, "is_admin": is_admin, "id": user_id}
+            self.store(users)
+            return user_id
+
+    def remove(self, username):
+        with self.locked():
+            users = dict(self.refresh().users)
+            if users.pop(username, None) is None:
+                return False
+            self.store(users)
+            return True
+
+    def remove_many(self, usernames):
+        """Remove several users with one write. Returns the removed {username: id}."""
+        with self.locked():
+            users = dict(self.refresh().users)
+            removed = {name: users.pop(name)["id"] for name in usernames if name in users}
+            if removed:
+                self.store(users)
+            return removed
+
+    def purge(self, usernames):
+        """Remove users and their predictions and chats. Returns (users, predictions, chats) removed."""
+        removed = self.remove_many(usernames)
+        n_preds, n_chats = database.delete_for_users(removed.values())
+        return len(removed), n_preds, n_chats
+
+    def set_password(self, username, password_hash):
+        with self.locked():
+            users = dict(self.refresh().users)
+            if username in users:
+                users[username] = dict(users[username], password=password_hash)
+                self.store(users)
+
+
+class _SQLiteRegistry(_Registry):
+    """Same cache, backed by the users table; a trigger-maintained version number replaces mtime/size."""
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    def current_version(self):
+        return self.db.users_version()
+
+    def read(self):
+        return self.db.users()
+
+    def store(self, users):
+        with self.lock:
+            self.db.replace_users(users)
+            self._loaded = False
+
+    def add(self, username, password_hash, is_admin=False):
+        user_id = self.db.add_user(username, password_hash, is_admin)
+        self._loaded = False
+        return user_id
+
+    def remove(self, username):
+        removed = self.db.remove_user(username)
+        self._loaded = False
+        return removed
+
+    def set_password(self, username, password_hash):
+        self.db.set_password(username, password_hash)
+        self._loaded = False
+
+    def purge(self, usernames):
+        counts = self.db.delete_users(usernames)
+        self._loaded = False
+        return counts
+
+
+if sqlite_store.STORAGE_BACKEND == "sqlite":
+    _registry = _SQLiteRegistry(sqlite_store.get_store())
+else:
+    _registry = _Registry()
 
 
 def load_users():
-    if not os.path.exists(USERS_FILE) or os.stat(USERS_FILE).st_size == 0:
-        return {}
-    with open(USERS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return copy.deepcopy(_registry.refresh().users)
 
 
 def save_users(users):
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, indent=4)
+    _registry.store(users)
 
 
 def register_user(username, password, is_admin=False):
-    users = load_users()
-    if username in users:
-        return False  
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-    users[username] = {"password": hashed, "is_admin": is_admin, "id": len(users) + 1}
-    save_users(users)
-    return True
+    if username in _registry.refresh().users:
+        return False
+    hashed = password_hashing.hash_password(password)
+    return _registry.add(username, hashed, is_admin) is not None
 
 def login_user(username, password):
-    users = load_users()
+    """
+    Check a password. Too many recent failures for a username are rejected
+    without hashing. A hash made with an outdated work factor is replaced
+    in the background after a successful login.
+    """
+    if not password_hashing.limiter.allowed(username):
+        return False
+    users = _registry.refresh().users
     if username in users:
-        stored_hash = users[username]["password"].encode("utf-8")
-        if bcrypt.checkpw(password.encode("utf-8"), stored_hash):
+        stored_hash = users[username]["password"]
+        if password_hashing.check_password(password, stored_hash):
+            password_hashing.limiter.reset(username)
+            if password_hashing.needs_rehash(stored_hash):
+                _rehash(username, password, stored_hash)
             return True
+    password_hashing.limiter.failed(username)
     return False
 
+def _rehash(username, password, old_hash):
+    """Hash again at the current work factor on the hashing pool; the login does not wait for it."""
+    def store(future):
+        if future.exception() is not None:
+            return
+        # skip if the password was changed while hashing
+        if _registry.refresh().users.get(username, {}).get("password") == old_hash:
+            _registry.set_password(username, future.result())
+
+    password_hashing.hash_password_async(password).add_done_callback(store)
+
 
 def is_admin(username):
-    users = load_users()
+    users = _registry.refresh().users
     return username in users and users[username].get("is_admin", False)
 
 
 def get_user_id(username):
-    users = load_users()
+    users = _registry.refresh().users
     return users[username]["id"] if username in users else None
 
+def get_username(user_id):
+    """Reverse lookup: username for a user id, or None."""
+    return _registry.refresh().by_id.get(user_id)
+
 def get_all_users():
-    users = load_users()
+    users = _registry.refresh().users
     return [{"id": u["id"], "username": k, "is_admin": u.get("is_admin", False)} for k, u in users.items()]
 # Add these to user.py (append at end)
 
@@ -53,23 +252,22 @@ def delete_user(username):
     """
     Remove a user entry from USERS_FILE.
     Returns True if deleted, False if user not found.
+    Ids of the remaining users are left untouched, since predictions and
+    chats refer to them.
     """
-    users = load_users()
-    if username in users:
-        users.pop(username)
-        # reassign ids to keep them sequential (optional)
-        new_users = {}
-        next_id = 1
-        for u, meta in users.items():
-            meta['id'] = next_id
-            new_users[u] = meta
-            next_id += 1
-        save_users(new_users)
-        return True
-    return False
+    return _registry.remove(username)
+
+def delete_users(usernames):
+    """
+    Delete several users together with all their predictions and chats,
+    as one batch: one write of the user store and one tombstone append
+    per log (a single transaction with SQLite).
+    Returns (users removed, predictions removed, chats removed).
+    """
+    return _registry.purge(list(usernames))
 
 def any_admin_exists():
-    users = load_users()
+    users = _registry.refresh().users
     return any(info.get("is_admin", False) for info in users.values())
 
 def create_default_admin(username="admin", password="admin123"):